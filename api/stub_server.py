@@ -0,0 +1,199 @@
+"""
+Deterministic stand-in for the LLM server and the ViVQA-X API.
+
+Serves the OpenAI chat-completions protocol (with `tool_calls`) and
+`/vqa/predict_base64` from one CPU-only process, with configurable injected
+latency, so the orchestration, concurrency modes and caching layers can be
+benchmarked without a GPU:
+
+    python api/stub_server.py --port 1234 --latency_ms 200 --jitter_ms 50
+    python main.py --experiment full_system \
+        --llm_base_url http://127.0.0.1:1234/v1 \
+        --vqa_api_url http://127.0.0.1:1234/vqa/predict_base64
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Union
+
+from fastapi import FastAPI, Form
+from pydantic import BaseModel
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from api.utils.stub_responses import (apply_limits, estimate_tokens, message_text, rule_based_response,
+                                      scripted_response, stable_hash, vqa_predictions)
+
+
+class StubSettings(BaseModel):
+    model: str = "Qwen/Qwen3-1.7B"
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    prefill_ms_per_token: float = 0.0
+    decode_ms_per_token: float = 0.0
+    vqa_latency_ms: float = 0.0
+    script: List[Dict[str, Any]] = []
+
+
+class ChatCompletionRequest(BaseModel):
+    model: Optional[str] = None
+    messages: List[Dict[str, Any]]
+    tools: Optional[List[Dict[str, Any]]] = None
+    max_tokens: Optional[int] = None
+    max_completion_tokens: Optional[int] = None
+    stop: Optional[Union[str, List[str]]] = None
+    temperature: Optional[float] = None
+    seed: Optional[int] = None
+
+    model_config = {"extra": "allow"}
+
+
+class VQAResponse(BaseModel):
+    success: bool
+    question: str
+    predictions: str
+    device_used: str
+
+
+app = FastAPI(title="Stub LLM / VQA server", version="1.0.0")
+app.state.settings = StubSettings()
+# System prompts seen recently, to report prefix-cache hits like vLLM does
+app.state.prefixes = OrderedDict()
+
+
+def _delay(settings: StubSettings, seed: int, prompt_tokens: int, completion_tokens: int) -> float:
+    """Injected latency in seconds; the jitter is deterministic per request"""
+    jitter = random.Random(seed).uniform(-settings.jitter_ms, settings.jitter_ms)
+    ms = (settings.latency_ms + jitter
+          + prompt_tokens * settings.prefill_ms_per_token
+          + completion_tokens * settings.decode_ms_per_token)
+    return max(0.0, ms) / 1000
+
+
+def _cached_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Tokens of a leading system message already seen (simulated prefix cache)"""
+    if not messages or messages[0].get("role") != "system":
+        return 0
+    prefix = message_text(messages[0])
+    prefixes = app.state.prefixes
+    cached = prefix in prefixes
+    prefixes[prefix] = True
+    prefixes.move_to_end(prefix)
+    while len(prefixes) > 256:
+        prefixes.popitem(last=False)
+    return estimate_tokens(prefix) if cached else 0
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": app.state.settings.model, "object": "model", "owned_by": "stub"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: ChatCompletionRequest):
+    settings: StubSettings = app.state.settings
+    prompt = json.dumps(request.messages, ensure_ascii=False, sort_keys=True)
+
+    reply = scripted_response(settings.script, request.messages) or rule_based_response(request.messages, request.tools)
+    content = apply_limits(reply["content"], request.max_completion_tokens or request.max_tokens, request.stop)
+
+    prompt_tokens = estimate_tokens("".join(message_text(m) for m in request.messages))
+    completion_tokens = estimate_tokens(content + json.dumps(reply.get("tool_calls", [])))
+    cached_tokens = _cached_tokens(request.messages)
+    await asyncio.sleep(_delay(settings, stable_hash(prompt), prompt_tokens - cached_tokens, completion_tokens))
+
+    message = {"role": "assistant", "content": content}
+    if reply.get("tool_calls"):
+        message["tool_calls"] = reply["tool_calls"]
+    return {
+        "id": f"chatcmpl-{stable_hash(prompt) % 10**12:012d}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.model or settings.model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "tool_calls" if reply.get("tool_calls") else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        },
+    }
+
+
+@app.post("/vqa/predict_base64", response_model=VQAResponse)
+async def predict_with_base64(
+    image_base64: str = Form(...),
+    question: str = Form(...),
+    top_k: int = Form(5, ge=1, le=10)
+):
+    settings: StubSettings = app.state.settings
+    if settings.vqa_latency_ms:
+        delay = settings.vqa_latency_ms / 1000
+    else:
+        delay = _delay(settings, stable_hash(question, image_base64[:256]), 0, 0)
+    await asyncio.sleep(delay)
+    return VQAResponse(
+        success=True,
+        question=question,
+        predictions=vqa_predictions(question, image_base64, top_k),
+        device_used="stub",
+    )
+
+
+@app.get("/vqa/health")
+async def vqa_health_check():
+    return {"model_loaded": True, "processor_loaded": True, "device": "stub"}
+
+
+@app.get("/")
+async def health_check():
+    return {"status": "ok", "message": "Stub LLM / VQA server is running", "model_loaded": True}
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Deterministic stand-in for the LLM server and the VQA API")
+    p.add_argument("--host", type=str, default="0.0.0.0")
+    p.add_argument("--port", type=int, default=1234)
+    p.add_argument("--model", type=str, default="Qwen/Qwen3-1.7B", help="Model id reported by /v1/models")
+    p.add_argument("--latency_ms", type=float, default=0.0, help="Base latency added to every LLM response")
+    p.add_argument("--jitter_ms", type=float, default=0.0, help="Uniform +/- jitter around the base latency")
+    p.add_argument("--prefill_ms_per_token", type=float, default=0.0,
+                   help="Extra latency per prompt token not covered by the simulated prefix cache")
+    p.add_argument("--decode_ms_per_token", type=float, default=0.0, help="Extra latency per completion token")
+    p.add_argument("--vqa_latency_ms", type=float, default=0.0,
+                   help="Fixed latency of /vqa/predict_base64 (default: same as the LLM base latency)")
+    p.add_argument("--script", type=str, default=None,
+                   help='JSON list of scripted replies: [{"match": regex, "content": str, "tool_calls": '
+                        '[{"name": str, "arguments": {}}]}]; the first match wins over the built-in rules')
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    args = parse_args()
+    script = []
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    app.state.settings = StubSettings(
+        model=args.model,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        prefill_ms_per_token=args.prefill_ms_per_token,
+        decode_ms_per_token=args.decode_ms_per_token,
+        vqa_latency_ms=args.vqa_latency_ms,
+        script=script,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
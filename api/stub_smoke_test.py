@@ -0,0 +1,123 @@
+"""
+End-to-end smoke test of the offline setup: `api/stub_server.py` as the LLM
+server and VQA API, and the DAM tools in stub mode (DAM_TOOLS_STUB=1).
+
+Starts the stub server in-process, runs a few questions on a generated image
+through the full graph and checks that every stage produced its output. No
+GPU, model weights or network access is needed apart from the judge's
+BERTScore model:
+
+    python api/stub_smoke_test.py --samples 3 --early_consensus --prefetch_tools vqa_tool
+"""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# Must be set before the tools are imported
+os.environ["DAM_TOOLS_STUB"] = "1"
+
+import uvicorn
+from langchain_core.tools import tool
+from PIL import Image
+
+from api.stub_server import app
+from src.core.graph_builder.main_graph import MainGraphBuilder
+from src.tools.vqa_tool import vqa_tool, lm_knowledge, dam_caption_image_tool
+from src.utils.image_store import image_store
+from src.utils.tool_memo import ToolMemo
+
+QUESTIONS = [
+    "Màu của chiếc xe là gì?",
+    "Có bao nhiêu người trong ảnh?",
+    "Con mèo có đang ngủ không?",
+]
+
+
+@tool("wikipedia")
+def offline_wikipedia(query: str) -> str:
+    """Search for information on a given topic using Wikipedia"""
+    return f"Page: {query}\nSummary: {query} is a common subject of everyday photos."
+
+
+@tool("arxiv")
+def offline_arxiv(query: str) -> str:
+    """Search for information on a given topic using Arxiv"""
+    return f"Published: 2020-01-01\nTitle: A study of {query}\nSummary: No relevant findings."
+
+
+def start_stub_server() -> str:
+    """Serve the stub on a free local port and return its base URL"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="stub-server", daemon=True).start()
+    deadline = time.time() + 30
+    while not server.started:
+        if time.time() > deadline:
+            raise RuntimeError("Stub server did not start")
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def check_result(result: dict) -> list:
+    """Stages of the pipeline that produced nothing for one question"""
+    return [key for key in ("image_caption", "results", "final_answer", "explanation") if not result.get(key)]
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Run the full graph against the stub server and stubbed DAM tools")
+    p.add_argument("--samples", type=int, default=len(QUESTIONS), help="Number of questions to run")
+    p.add_argument("--fused_reasoning", action="store_true")
+    p.add_argument("--early_consensus", action="store_true")
+    p.add_argument("--static_tool_plans", action="store_true")
+    p.add_argument("--prefetch_tools", type=str, nargs="*", default=[])
+    return p.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    base_url = start_stub_server()
+    os.environ["LLM_BASE_URL"] = f"{base_url}/v1"
+    os.environ["VQA_API_URL"] = f"{base_url}/vqa/predict_base64"
+
+    tools_registry = {
+        "vqa_tool": vqa_tool,
+        "arxiv": offline_arxiv,
+        "wikipedia": offline_wikipedia,
+        "lm_knowledge": lm_knowledge,
+        "analyze_image_object": dam_caption_image_tool,
+    }
+    graph = MainGraphBuilder(tools_registry, fused_reasoning=args.fused_reasoning,
+                             early_consensus=args.early_consensus,
+                             prefetch_tools=args.prefetch_tools,
+                             static_tool_plans=args.static_tool_plans).create_main_workflow()
+
+    handle = image_store.put(Image.new("RGB", (64, 48), (200, 30, 30)))
+    failures = 0
+    try:
+        for i in range(args.samples):
+            question = QUESTIONS[i % len(QUESTIONS)]
+            start = time.time()
+            result = graph.invoke({"question": question, "image": handle, "image_id": "smoke-test"},
+                                  {"configurable": {"tool_memo": ToolMemo()}})
+            missing = check_result(result)
+            status = "FAIL (missing: " + ", ".join(missing) + ")" if missing else "ok"
+            print(f"[{status}] {question} -> {result.get('final_answer')!r} ({time.time() - start:.2f}s)")
+            failures += bool(missing)
+    finally:
+        image_store.release(handle)
+
+    print(f"{args.samples - failures}/{args.samples} questions completed end to end")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
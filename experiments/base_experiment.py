@@ -1,26 +1,60 @@
 # experiments/base_experiment.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Union
+from typing import Callable, Dict, Any, List, Union
 import json
 import os
 import time
 import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from PIL import Image
 from tqdm import tqdm
 import torch
 
 from src.evaluation.metrics_x import VQAXEvaluator
-from src.utils.text_processing import normalize_answer
+from src.evaluation.results_store import save_columnar
+from src.evaluation.scoring import compute_metrics
+from src.utils.tracing import tracer
+from src.utils.artifact_cache import artifact_cache
+from src.utils.image_store import image_store
+from src.utils.cancellation import CancelToken, SampleCancelled, cancel_scope
+from src.utils.usage_tracking import summarize_usage, usage_metrics, usage_scope
+from src.utils.tool_memo import ToolMemo
+from src.core.nodes.prefetch_node import configure_prefetch_executor
+from src.core.nodes.subgraph_node import configure_tool_executor
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
 class BaseExperiment(ABC):
-    def __init__(self, sample_size: int = None, test_json_path: str = None, test_image_dir: str = None):
+    def __init__(self, sample_size: int = None, test_json_path: str = None, test_image_dir: str = None,
+                 max_concurrency: int = 1, resume: bool = False,
+                 shard_index: int = 0, num_shards: int = 1, results_format: str = "json",
+                 sample_timeout: float = None, run_time_budget: float = None):
         self.sample_size = sample_size
         self.test_json_path = test_json_path
         self.test_image_dir = test_image_dir
+        # Number of samples allowed in flight at once (1 = sequential)
+        self.max_concurrency = max(1, max_concurrency or 1)
+        # Skip samples already completed in the results log of a previous run
+        self.resume = resume
+        self._log_lock = threading.Lock()
+        # Deterministic split of the dataset across processes / machines
+        if num_shards < 1 or not 0 <= shard_index < num_shards:
+            raise ValueError(f"Invalid shard {shard_index} of {num_shards}")
+        self.shard_index = shard_index
+        self.num_shards = num_shards
+        # "json" (single indented file), "parquet" (rows + metadata) or "both"
+        if results_format not in ("json", "parquet", "both"):
+            raise ValueError(f"Unknown results format: {results_format}")
+        self.results_format = results_format
+        # Seconds allowed per sample / for the whole run (None = unbounded)
+        self.sample_timeout = sample_timeout
+        self.run_time_budget = run_time_budget
+        self._run_deadline = None
         self.evaluator = VQAXEvaluator()
         
         # Create results directory
@@ -31,7 +65,7 @@ class BaseExperiment(ABC):
         self.data = self.load_data()
         
     def load_data(self) -> List[Dict]:
-        """Load ViVQA-X dataset"""
+        """Load ViVQA-X annotations (images are decoded lazily, see `load_image`)"""
         json_path = self.test_json_path
         coco_img_dir = self.test_image_dir
         
@@ -43,26 +77,31 @@ class BaseExperiment(ABC):
         with open(json_path, "r", encoding="utf-8") as f:
             data = json.load(f)
         
+        # Limit samples before touching any image
+        if self.sample_size != 0:
+            data = data[:self.sample_size]
+        
+        # Keep every num_shards-th sample, so the shards partition the selection
+        data = data[self.shard_index::self.num_shards]
+        
         samples = []
         for item in data:
-            img_path = os.path.join(coco_img_dir, item["image_name"])
-            image = Image.open(img_path).convert("RGB")
             sample = {
                 "question": item["question"],
-                "image": image,
-                "image_path": img_path,
+                "image_path": os.path.join(coco_img_dir, item["image_name"]),
                 "explanation": item["explanation"],
                 "answer": item["answer"],
                 "question_id": item["question_id"]
             }
             samples.append(sample)
-        
-        # Limit samples if specified
-        if self.sample_size != 0:
-            samples = samples[:self.sample_size]
             
         return samples
     
+    def load_image(self, sample: Dict) -> Image.Image:
+        """Decode the image of a sample"""
+        with Image.open(sample["image_path"]) as img:
+            return img.convert("RGB")
+    
     @abstractmethod
     def setup_system(self):
         """Setup the system/graph for the experiment"""
@@ -70,9 +109,30 @@ class BaseExperiment(ABC):
     
     def run_single_sample(self, graph, sample: Dict) -> Dict:
         """Run inference on a single sample"""
+        # Questions on the same image share the decoded image and its artifacts
+        image_id = sample["image_path"]
+        token = CancelToken(deadline=self.sample_deadline())
+        partial: Dict[str, Any] = {}
+        # Tool results shared by the analyst subgraphs of this sample
+        tool_memo = ToolMemo()
+        image_handle = None
+        graph_started = False
+
+        def release_image():
+            if image_handle is not None:
+                image_store.release(image_handle)
+            # Image artifacts are freed once the last question on the image is done
+            artifact_cache.release(image_id)
+
         try:
-            initial_state = {"question": sample["question"], "image": sample["image"]}
-            result = graph.invoke(initial_state)
+            image = artifact_cache.get_or_compute(image_id, "image", lambda: self.load_image(sample))
+            # The graph state carries only the handle; tools resolve it on demand
+            image_handle = image_store.put(image)
+            initial_state = {"question": sample["question"], "image": image_handle, "image_id": image_id}
+            config = {"configurable": {"tool_memo": tool_memo}}
+            # From here on the graph run owns the image and releases it once its nodes have stopped
+            graph_started = True
+            result = self.invoke_graph(graph, initial_state, token, partial, config, on_exit=release_image)
             
             return {
                 "question": sample["question"],
@@ -83,21 +143,138 @@ class BaseExperiment(ABC):
                 "gold_answer": sample["answer"],
                 "gold_explanation": sample["explanation"],
                 "question_id": sample["question_id"],
+                "tool_memo": tool_memo.stats(),
                 "success": True,
                 "error": None
             }
-        except Exception as e:
-            logger.error(f"Error processing sample {sample['question_id']}: {e}")
+        except SampleCancelled as e:
+            logger.warning(f"Sample {sample['question_id']} timed out: {e}")
             return {
-                "question": sample["question"],
-                "question_id": sample["question_id"],
-                "success": False,
-                "error": str(e),
-                "final_answer": "",
-                "explanation": "",
-                "gold_answer": sample["answer"],
-                "gold_explanation": sample["explanation"]
+                **self.failed_result(sample, f"Timed out: {e}"),
+                "timed_out": True,
+                # Whatever the pipeline produced before the deadline
+                "image_caption": partial.get("image_caption", ""),
+                "rationales": [{k: v} for k, v in partial.get("rationales", {}).items()],
+                "agent_results": partial.get("agent_results", {}),
             }
+        except Exception as e:
+            logger.error(f"Error processing sample {sample['question_id']}: {e}")
+            return self.failed_result(sample, str(e))
+        finally:
+            # Stop any node work still running for this sample
+            token.cancel("sample finished")
+            # Speculative tool calls nobody asked for
+            tool_memo.cancel_unused()
+            if not graph_started:
+                release_image()
+    
+    def failed_result(self, sample: Dict, error: str) -> Dict:
+        """Result record of a sample that did not complete"""
+        return {
+            "question": sample["question"],
+            "question_id": sample["question_id"],
+            "success": False,
+            "error": error,
+            "final_answer": "",
+            "explanation": "",
+            "gold_answer": sample["answer"],
+            "gold_explanation": sample["explanation"]
+        }
+    
+    def sample_deadline(self):
+        """Absolute deadline of a sample starting now, bounded by the run budget"""
+        deadlines = [d for d in (
+            time.time() + self.sample_timeout if self.sample_timeout else None,
+            self._run_deadline,
+        ) if d is not None]
+        return min(deadlines) if deadlines else None
+    
+    def invoke_graph(self, graph, initial_state: Dict, token: CancelToken, partial: Dict,
+                     config: Dict = None, on_exit: Callable[[], None] = None) -> Dict:
+        """
+        Run the graph under `token` and return its final state.
+        
+        Node outputs are recorded in `partial` as they complete. With a deadline,
+        the graph runs on a helper thread; when the deadline passes the token is
+        cancelled (running nodes stop at their next check) and SampleCancelled
+        is raised immediately.
+        
+        `on_exit` runs once no node of the run is executing any more: before
+        this returns or raises, or, after a timeout, on the helper thread when
+        the cancelled nodes have actually stopped.
+        """
+        final_state: Dict[str, Any] = {}
+        
+        def consume():
+            with cancel_scope(token):
+                for namespace, mode, chunk in graph.stream(
+                    initial_state, config, stream_mode=["values", "updates"], subgraphs=True
+                ):
+                    if mode == "values" and not namespace:
+                        final_state.clear()
+                        final_state.update(chunk)
+                    elif mode == "updates":
+                        self.record_partial(partial, chunk)
+        
+        def finish():
+            if on_exit is not None:
+                on_exit()
+        
+        if token.deadline is None:
+            try:
+                consume()
+            finally:
+                finish()
+            return final_state
+        
+        errors = []
+        handoff = threading.Lock()
+        status = {"done": False, "abandoned": False}
+        def worker():
+            try:
+                consume()
+            except BaseException as e:
+                errors.append(e)
+            finally:
+                with handoff:
+                    status["done"] = True
+                    abandoned = status["abandoned"]
+                if abandoned:
+                    finish()
+        
+        # Keep the tracer's sample id in the helper thread
+        context = contextvars.copy_context()
+        thread = threading.Thread(target=context.run, args=(worker,), daemon=True)
+        thread.start()
+        thread.join(token.remaining())
+        with handoff:
+            # Nodes still running: the helper thread calls `on_exit` when they stop
+            status["abandoned"] = not status["done"]
+        if status["abandoned"]:
+            token.cancel("sample deadline exceeded")
+            raise SampleCancelled(token.reason)
+        try:
+            if errors:
+                raise errors[0]
+            return final_state
+        finally:
+            finish()
+    
+    @staticmethod
+    def record_partial(partial: Dict, chunk: Dict):
+        """Keep the caption, per-agent rationales/answers and voted answer seen so far"""
+        for update in chunk.values():
+            if not isinstance(update, dict):
+                continue
+            if update.get("image_caption"):
+                partial["image_caption"] = update["image_caption"]
+            if update.get("final_answer"):
+                partial["final_answer"] = update["final_answer"]
+            for key, target in (("rationales", "rationales"), ("results", "agent_results")):
+                values = update.get(key) or []
+                for item in values if isinstance(values, list) else [values]:
+                    if isinstance(item, dict):
+                        partial.setdefault(target, {}).update(item)
     
     def run(self) -> Dict[str, Any]:
         """Run the complete experiment"""
@@ -106,36 +283,57 @@ class BaseExperiment(ABC):
         # Setup system
         graph = self.setup_system()
         
-        # Process all samples
-        results = []
-        successful_samples = 0
+        # Pick up where a previous run stopped, or start a fresh results log
+        completed = self.load_results_log() if self.resume else {}
+        if not self.resume:
+            open(self.results_log_path, 'w', encoding='utf-8').close()
+        pending = [s for s in self.data if s["question_id"] not in completed]
+        pending = self.schedule_by_image(pending)
+        for sample in pending:
+            artifact_cache.retain(sample["image_path"])
+        tracer.configure(self.trace_log_path, append=self.resume)
+        self._run_deadline = time.time() + self.run_time_budget if self.run_time_budget else None
+        if completed:
+            print(f"Resuming: {len(completed)} samples already in {self.results_log_path}, "
+                  f"{len(pending)} remaining")
         
-        for i, sample in enumerate(tqdm(self.data, desc=f"Processing {self.experiment_name}")):
-            print(f"\n--- Sample {i+1}/{len(self.data)} (ID: {sample['question_id']}) ---")
-            
-            start_time = time.time()
-            result = self.run_single_sample(graph, sample)
-            end_time = time.time()
-            
-            result["processing_time"] = end_time - start_time
-            results.append(result)
-            
-            if result["success"]:
-                successful_samples += 1
-                print("✅ Sample processed successfully")
+        # Process remaining samples
+        try:
+            if self.max_concurrency > 1:
+                new_results = self.run_concurrent(graph, pending)
             else:
-                print(f"❌ Sample failed: {result['error']}")
+                new_results = self.run_sequential(graph, pending)
+        finally:
+            tracer.close()
+        
+        # Merge previous and new results in dataset order
+        by_id = {**completed, **{r["question_id"]: r for r in new_results}}
+        results = [by_id[s["question_id"]] for s in self.data if s["question_id"] in by_id]
+        successful_samples = sum(1 for r in results if r["success"])
+        timed_out_samples = sum(1 for r in results if r.get("timed_out"))
+        skipped_samples = sum(1 for r in results if r.get("skipped"))
         
         # Compute metrics
         metrics = self.compute_metrics(results)
+        usage_summary = summarize_usage(results)
+        if "error" not in metrics:
+            metrics.update(usage_metrics(usage_summary))
+        latency_summary = tracer.summary()
+        self.print_latency_summary(latency_summary)
+        self.print_usage_summary(usage_summary)
         
         # Prepare final results
         final_results = {
             "experiment_name": self.experiment_name,
-            "num_samples": len(self.data),
+            "num_samples": len(results),
             "successful_samples": successful_samples,
-            "failed_samples": len(self.data) - successful_samples,
+            "failed_samples": len(results) - successful_samples,
+            "timed_out_samples": timed_out_samples,
+            "skipped_samples": skipped_samples,
             "metrics": metrics,
+            "latency_summary": latency_summary,
+            "usage_summary": usage_summary,
+            "run_metadata": self.run_metadata(),
             "detailed_results": results,
             "timestamp": datetime.now().isoformat()
         }
@@ -148,64 +346,172 @@ class BaseExperiment(ABC):
         
         return final_results
     
-    def compute_metrics(self, results: List[Dict]) -> Dict[str, Any]:
-        """Compute evaluation metrics"""
-        try:
-            # Extract successful results only
-            successful_results = [r for r in results if r["success"]]
-            
-            if not successful_results:
-                return {"error": "No successful samples to evaluate"}
-            
-            # Prepare answers
-            predicted_answers = [normalize_answer(r["final_answer"]) for r in successful_results]
-            ground_truth_answers = [normalize_answer(r["gold_answer"]) for r in successful_results]
-            
-            # Create vocabulary for answers
-            all_answers = sorted(list(set(predicted_answers + ground_truth_answers)))
-            answer_to_idx = {ans: i for i, ans in enumerate(all_answers)}
-            
-            predicted_answer_indices = [answer_to_idx[ans] for ans in predicted_answers]
-            ground_truth_answer_indices = [answer_to_idx[ans] for ans in ground_truth_answers]
+    def run_metadata(self) -> Dict[str, Any]:
+        """System-specific statistics stored with the results (override in subclasses)"""
+        return {}
+    
+    def schedule_by_image(self, samples: List[Dict]) -> List[Dict]:
+        """Order samples so that questions on the same image run back to back"""
+        groups: Dict[str, List[Dict]] = {}
+        for sample in samples:
+            groups.setdefault(sample["image_path"], []).append(sample)
+        return [sample for group in groups.values() for sample in group]
+    
+    def process_sample(self, graph, sample: Dict) -> Dict:
+        """Run a single sample and attach its wall-clock processing time"""
+        if self._run_deadline is not None and time.time() >= self._run_deadline:
+            # Out of run budget: record without running (and without logging,
+            # so a resumed run picks the sample up again)
+            artifact_cache.release(sample["image_path"])
+            return {**self.failed_result(sample, "Run time budget exhausted"),
+                    "skipped": True, "processing_time": 0.0}
+        
+        start_time = time.time()
+        with tracer.sample(sample["question_id"]), tracer.span("sample"), usage_scope() as usage:
+            result = self.run_single_sample(graph, sample)
+        end_time = time.time()
+        
+        result["processing_time"] = end_time - start_time
+        result["usage"] = usage.to_dict()
+        self.append_to_results_log(result)
+        return result
+    
+    def run_sequential(self, graph, samples: List[Dict]) -> List[Dict]:
+        """Process samples one at a time"""
+        results = []
+        for i, sample in enumerate(tqdm(samples, desc=f"Processing {self.experiment_name}")):
+            print(f"\n--- Sample {i+1}/{len(samples)} (ID: {sample['question_id']}) ---")
             
-            # Prepare explanations
-            predicted_explanations = {
-                str(r["question_id"]): [r["explanation"]] 
-                for r in successful_results
-            }
-            ground_truth_explanations = {
-                str(r["question_id"]): r["gold_explanation"] 
-                for r in successful_results
+            result = self.process_sample(graph, sample)
+            results.append(result)
+            self.report_sample(result)
+        return results
+    
+    def run_concurrent(self, graph, samples: List[Dict]) -> List[Dict]:
+        """Process samples on a worker pool with at most `max_concurrency` in flight"""
+        results: List[Union[Dict, None]] = [None] * len(samples)
+        # Parallel tool calls of concurrent samples must not queue behind each other
+        configure_tool_executor(self.max_concurrency)
+        configure_prefetch_executor(self.max_concurrency)
+        
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Workers only receive annotation records; images are decoded inside
+            # the worker, so memory is bounded by the samples in flight.
+            futures = {
+                executor.submit(self.process_sample, graph, sample): i
+                for i, sample in enumerate(samples)
             }
-            
-            # Compute metrics
-            answer_metrics = self.evaluator.compute_answer_metrics(
-                predicted_answer_indices, ground_truth_answer_indices
-            )
-            
-            explanation_metrics = self.evaluator.compute_explanation_metrics(
-                predicted_explanations, ground_truth_explanations
-            )
-            
-            return {**answer_metrics, **explanation_metrics}
-            
-        except Exception as e:
-            logger.error(f"Error computing metrics: {e}")
-            return {"error": f"Failed to compute metrics: {e}"}
+            progress = tqdm(as_completed(futures), total=len(futures),
+                            desc=f"Processing {self.experiment_name}")
+            for future in progress:
+                i = futures[future]
+                result = future.result()
+                results[i] = result
+                print(f"\n--- Sample {i+1}/{len(samples)} (ID: {result['question_id']}) ---")
+                self.report_sample(result)
+        
+        # Keep results in dataset order regardless of completion order
+        return results
+    
+    def print_latency_summary(self, latency_summary: Dict[str, Dict[str, float]]):
+        """Print per-stage latency percentiles collected by the tracer"""
+        if not latency_summary:
+            return
+        print("\n--- Latency per stage (s) ---")
+        print(f"{'stage':<32}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for stage, stats in latency_summary.items():
+            print(f"{stage:<32}{stats['count']:>7}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['p99']:>10.3f}")
+    
+    def print_usage_summary(self, usage_summary: Dict[str, Any]):
+        """Print LLM calls and tokens per node and per agent"""
+        if not usage_summary["samples"]:
+            return
+        for title, groups in (("node", usage_summary["by_node"]), ("agent", usage_summary["by_agent"])):
+            print(f"\n--- LLM usage per {title} ({usage_summary['samples']} samples) ---")
+            print(f"{title:<32}{'calls':>8}{'prompt':>12}{'completion':>12}{'llm time':>10}")
+            for name, entry in groups.items():
+                print(f"{name:<32}{entry.get('llm_calls', 0):>8}{entry.get('prompt_tokens', 0):>12}"
+                      f"{entry.get('completion_tokens', 0):>12}{entry.get('llm_time', 0):>10.1f}")
+    
+    def report_sample(self, result: Dict):
+        """Print the outcome of a processed sample"""
+        if result["success"]:
+            print("✅ Sample processed successfully")
+        else:
+            print(f"❌ Sample failed: {result['error']}")
+    
+    def compute_metrics(self, results: List[Dict]) -> Dict[str, Any]:
+        """Compute evaluation metrics"""
+        return compute_metrics(results, self.evaluator)
+    
+    @property
+    def results_basename(self) -> str:
+        """Base name shared by the results file and the per-sample log"""
+        if self.sample_size != 0:
+            basename = f"{self.experiment_name}_results_{self.sample_size}"
+        else:
+            basename = f"{self.experiment_name}_results_full"
+        if self.num_shards > 1:
+            basename += f"_shard{self.shard_index}of{self.num_shards}"
+        return basename
+    
+    @property
+    def results_log_path(self) -> str:
+        """JSONL log that receives every per-sample result as soon as it completes"""
+        return os.path.join(self.results_dir, f"{self.results_basename}.jsonl")
+    
+    @property
+    def trace_log_path(self) -> str:
+        """JSONL sink for per-node, per-tool and per-LLM-call spans"""
+        return os.path.join(self.results_dir, f"{self.results_basename}_trace.jsonl")
+    
+    def append_to_results_log(self, result: Dict):
+        """Durably append one per-sample result to the results log"""
+        line = json.dumps(result, ensure_ascii=False)
+        with self._log_lock:
+            with open(self.results_log_path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+    
+    def load_results_log(self) -> Dict[Any, Dict]:
+        """Load successful results from the results log, keyed by question_id"""
+        completed = {}
+        if not os.path.exists(self.results_log_path):
+            return completed
+        
+        with open(self.results_log_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-write can leave a truncated last line
+                    logger.warning(f"Skipping corrupt line {line_no} in {self.results_log_path}")
+                    continue
+                # Failed samples are retried; later records win
+                if record.get("success"):
+                    completed[record["question_id"]] = record
+                else:
+                    completed.pop(record["question_id"], None)
+        return completed
     
     def save_results(self, results: Dict[str, Any]):
         """Save experiment results"""
 
-        if self.sample_size != 0:
-            filename = f"{self.experiment_name}_results_{self.sample_size}.json"
-        else:
-            filename = f"{self.experiment_name}_results_full.json"
-        filepath = os.path.join(self.results_dir, filename)
+        base_path = os.path.join(self.results_dir, self.results_basename)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=4)
+        if self.results_format in ("json", "both"):
+            filepath = f"{base_path}.json"
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=4)
+            print(f"\nResults saved to {filepath}")
         
-        print(f"\nResults saved to {filepath}")
+        if self.results_format in ("parquet", "both"):
+            rows_path, meta_path = save_columnar(results, base_path)
+            print(f"\nResults saved to {rows_path} (metrics in {meta_path})")
         
         # Print summary
         if "metrics" in results and isinstance(results["metrics"], dict) and "error" not in results["metrics"]:
@@ -0,0 +1,50 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+
+PROJ_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJ_ROOT))
+
+from src.evaluation.results_store import save_columnar
+
+
+def convert(json_path: Path, out_dir: Path = None) -> None:
+    with open(json_path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+
+    if not isinstance(results, dict) or "detailed_results" not in results:
+        print(f"Skipping {json_path}: no detailed_results (metrics-only file)")
+        return
+
+    base_path = (out_dir or json_path.parent) / json_path.stem
+    rows_path, meta_path = save_columnar(results, str(base_path))
+    print(f"{json_path} -> {rows_path}, {meta_path}")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Convert JSON experiment results to Parquet rows + metadata JSON")
+    p.add_argument("inputs", type=str, nargs="+",
+                   help="Result JSON files or directories (searched recursively for *.json)")
+    p.add_argument("--out_dir", type=str, default=None,
+                   help="Output directory; defaults to next to each input file")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    out_dir = Path(args.out_dir) if args.out_dir else None
+    if out_dir:
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    for item in args.inputs:
+        path = Path(item)
+        files = sorted(path.rglob("*.json")) if path.is_dir() else [path]
+        for json_path in files:
+            if json_path.name.endswith(".meta.json"):
+                continue
+            convert(json_path, out_dir)
+
+
+if __name__ == "__main__":
+    main()
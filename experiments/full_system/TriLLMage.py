@@ -1,12 +1,21 @@
+from typing import Sequence
 from experiments.base_experiment import BaseExperiment
 from src.core.graph_builder.main_graph import MainGraphBuilder
 from src.tools.knowledge_tools import arxiv, wikipedia
 from src.tools.vqa_tool import vqa_tool, lm_knowledge, dam_caption_image_tool
+from src.models.llm_provider import get_llm_cache, get_dispatcher, get_endpoint_pool
+from src.utils.prompt_utils import prompt_stats
 
 class FullSystemVQAXExperiment(BaseExperiment):
-    def __init__(self, sample_size: int, test_json_path: str, test_image_dir: str):
+    def __init__(self, sample_size: int, test_json_path: str, test_image_dir: str,
+                 fused_reasoning: bool = False, early_consensus: bool = False,
+                 prefetch_tools: Sequence[str] = (), static_tool_plans: bool = False, **kwargs):
         self.experiment_name = "full_system"
-        super().__init__(sample_size, test_json_path, test_image_dir)
+        self.fused_reasoning = fused_reasoning
+        self.early_consensus = early_consensus
+        self.prefetch_tools = prefetch_tools
+        self.static_tool_plans = static_tool_plans
+        super().__init__(sample_size, test_json_path, test_image_dir, **kwargs)
     
     def setup_system(self):
         """Setup complete multi-agent system"""
@@ -18,5 +27,22 @@ class FullSystemVQAXExperiment(BaseExperiment):
             "analyze_image_object": dam_caption_image_tool,
         }
         
-        builder = MainGraphBuilder(tools_registry)
-        return builder.create_main_workflow()
\ No newline at end of file
+        builder = MainGraphBuilder(tools_registry, fused_reasoning=self.fused_reasoning,
+                                   early_consensus=self.early_consensus,
+                                   prefetch_tools=self.prefetch_tools,
+                                   static_tool_plans=self.static_tool_plans)
+        return builder.create_main_workflow()
+    
+    def run_metadata(self):
+        """Prompt prefix sizes, plus LLM cache / batching / endpoint pool statistics when enabled"""
+        metadata = {"prompt_prefixes": prompt_stats.summary()}
+        llm_cache = get_llm_cache()
+        if llm_cache is not None:
+            metadata["llm_cache"] = llm_cache.stats()
+        dispatcher = get_dispatcher()
+        if dispatcher is not None:
+            metadata["llm_batching"] = dispatcher.stats()
+        endpoint_pool = get_endpoint_pool()
+        if endpoint_pool is not None:
+            metadata["llm_endpoints"] = endpoint_pool.stats()
+        return metadata
@@ -0,0 +1,81 @@
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+PROJ_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJ_ROOT))
+
+from src.evaluation.scoring import compute_metrics, load_result_records
+from src.evaluation.metrics_x import VQAXEvaluator
+from src.utils.usage_tracking import summarize_usage, usage_metrics
+
+
+def merge_records(paths):
+    """Union per-sample results of all shards; a successful record beats a failed one"""
+    by_id = {}
+    for path in paths:
+        for record in load_result_records(path):
+            qid = record["question_id"]
+            if qid not in by_id or record.get("success") or not by_id[qid].get("success"):
+                by_id[qid] = record
+    return list(by_id.values())
+
+
+def question_id_key(record):
+    """Numeric ids in numeric order (2 before 10), then any non-numeric ids as text"""
+    qid = str(record["question_id"])
+    return (0, int(qid), "") if qid.lstrip("-").isdigit() else (1, 0, qid)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Merge sharded experiment results and compute metrics once")
+    p.add_argument("--inputs", type=str, nargs="+", required=True,
+                   help="Shard result files (.json results or .jsonl results logs)")
+    p.add_argument("--out", type=str, required=True, help="Merged results JSON path")
+    p.add_argument("--experiment_name", type=str, default="full_system")
+    p.add_argument("--device", type=str, default="cuda", help="Device used for BERTScore")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    results = merge_records(args.inputs)
+    results.sort(key=question_id_key)
+    successful_samples = sum(1 for r in results if r["success"])
+    print(f"Merged {len(results)} samples from {len(args.inputs)} shard files")
+
+    metrics = compute_metrics(results, VQAXEvaluator(device=args.device))
+    usage_summary = summarize_usage(results)
+    if "error" not in metrics:
+        metrics.update(usage_metrics(usage_summary))
+
+    merged = {
+        "experiment_name": args.experiment_name,
+        "num_samples": len(results),
+        "successful_samples": successful_samples,
+        "failed_samples": len(results) - successful_samples,
+        "metrics": metrics,
+        "usage_summary": usage_summary,
+        "shard_files": args.inputs,
+        "detailed_results": results,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=4)
+    print(f"Merged results saved to {args.out}")
+
+    if "error" not in metrics:
+        print("\n--- Evaluation Results ---")
+        for metric, value in metrics.items():
+            print(f"{metric.replace('_', ' ').title()}: {value:.4f}")
+    else:
+        print(f"Metrics computation failed: {metrics['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sys
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+PROJ_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJ_ROOT))
+
+# Only the evaluation stack is imported here: no graph, DAM or LLM clients
+from src.evaluation.scoring import compute_metrics, load_result_records
+from src.evaluation.metrics_x import VQAXEvaluator
+from src.evaluation.results_store import load_rows
+
+# Fields needed to score a sample
+SCORING_COLUMNS = ["question_id", "success", "final_answer", "explanation", "gold_answer", "gold_explanation"]
+
+
+def load_for_scoring(path: str):
+    if path.endswith(".parquet"):
+        return load_rows(path, columns=SCORING_COLUMNS)
+    return load_result_records(path)
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Re-compute metrics over saved experiment results")
+    p.add_argument("inputs", type=str, nargs="+",
+                   help="Results files (.json, .jsonl results log or .parquet rows)")
+    p.add_argument("--answers_only", action="store_true",
+                   help="Only compute answer accuracy / F1 (skips COCO metrics and BERTScore)")
+    p.add_argument("--device", type=str, default="cuda", help="Device used for BERTScore")
+    p.add_argument("--out", type=str, default=None,
+                   help="Optional JSON path for the re-computed metrics of every input")
+    return p.parse_args()
+
+
+def main():
+    args = parse_args()
+    evaluator = VQAXEvaluator(device=args.device, explanation_metrics=not args.answers_only)
+
+    rescored = {}
+    for path in args.inputs:
+        results = load_for_scoring(path)
+        metrics = compute_metrics(results, evaluator, answers_only=args.answers_only)
+        rescored[path] = {
+            "num_samples": len(results),
+            "successful_samples": sum(1 for r in results if r.get("success")),
+            "metrics": metrics,
+        }
+
+        print(f"\n--- {path} ({len(results)} samples) ---")
+        if "error" in metrics:
+            print(f"Metrics computation failed: {metrics['error']}")
+            continue
+        for metric, value in metrics.items():
+            print(f"{metric.replace('_', ' ').title()}: {value:.4f}")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"rescored": rescored, "timestamp": datetime.now().isoformat()},
+                      f, ensure_ascii=False, indent=4)
+        print(f"\nRe-computed metrics saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import os
 os.environ["CUDA_VISIBLE_DEVICES"] = "1"
 import argparse
 from experiments.full_system.TriLLMage import FullSystemVQAXExperiment
+from src.core.nodes.prefetch_node import PREFETCHABLE_TOOLS
+from src.models.llm_provider import configure_connection_pool
 
 def main():
     parser = argparse.ArgumentParser(description="Visual Multi-Agent Knowledge QA System")
@@ -19,15 +21,97 @@ def main():
     parser.add_argument("--test_image_dir", type=str,
                         default="data/COCO_Images/val2014/",
                         help="Path to the COCO validation images directory. Example: /mnt/VLAI_data/COCO_Images/val2014/")
+    parser.add_argument("--max_concurrency", type=int, default=1,
+                        help="Maximum number of samples processed concurrently (1 = sequential)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip samples already completed in the results log of a previous run")
+    parser.add_argument("--shard_index", type=int, default=0,
+                        help="Index of the shard processed by this run (0-based)")
+    parser.add_argument("--num_shards", type=int, default=1,
+                        help="Total number of shards the test set is split into")
+    parser.add_argument("--results_format", type=str, default="json",
+                        choices=["json", "parquet", "both"],
+                        help="Output format: indented JSON, Parquet rows + metadata JSON, or both")
+    parser.add_argument("--sample_timeout", type=float, default=None,
+                        help="Per-sample deadline in seconds; late samples are recorded as timed out")
+    parser.add_argument("--run_time_budget", type=float, default=None,
+                        help="Time budget for the whole run in seconds; samples not started in time are skipped")
+    parser.add_argument("--fused_reasoning", action="store_true",
+                        help="Generate each analyst's rationale and answer in one LLM call instead of two")
+    parser.add_argument("--early_consensus", action="store_true",
+                        help="Finalize the vote as soon as the outcome is fixed and cancel the outstanding analysts")
+    parser.add_argument("--prefetch_tools", type=str, nargs="+", default=[], choices=list(PREFETCHABLE_TOOLS),
+                        help="Start these tool calls speculatively while the caption is generated "
+                             "(vqa_tool on the question, wikipedia on its keywords)")
+    parser.add_argument("--static_tool_plans", action="store_true",
+                        help="Run the fixed tool plan of analysts that declare one (Junior) instead of the LLM planner")
+    parser.add_argument("--llm_base_url", type=str, default=None,
+                        help="OpenAI-compatible LLM endpoint for this run. Example: http://127.0.0.1:1234/v1")
+    parser.add_argument("--llm_endpoints", type=str, default=None,
+                        help="LLM replica pool: comma-separated URLs or a JSON file (overrides --llm_base_url)")
+    parser.add_argument("--llm_hedge_after_ms", type=float, default=None,
+                        help="Duplicate an LLM call on a second replica when it is still running after this long")
+    parser.add_argument("--llm_max_connections", type=int, default=None,
+                        help="Size of the keep-alive connection pool shared by all LLM clients")
+    parser.add_argument("--llm_cache", type=str, default=None,
+                        help="Path of the on-disk LLM response cache (disabled by default). Example: cache/llm_cache.sqlite")
+    parser.add_argument("--llm_cache_max_mb", type=int, default=1024,
+                        help="Size limit of the LLM response cache; least recently used entries are evicted")
+    parser.add_argument("--llm_seed", type=int, default=None,
+                        help="Pin the sampling seed so that sampled (temperature > 0) calls are cacheable")
+    parser.add_argument("--llm_batch_window_ms", type=float, default=0,
+                        help="Collect concurrent LLM calls for this long and submit them together (default 0 = off). "
+                             "Calls are still sent as individual requests, so this only adds latency "
+                             "unless the server schedules the burst better; measure before enabling")
+    parser.add_argument("--llm_max_batch_size", type=int, default=32,
+                        help="Maximum number of LLM calls submitted in one batch")
+    parser.add_argument("--llm_prefix_grouping", action="store_true",
+                        help="Order batched LLM calls by prompt prefix to reuse the server's prefix cache "
+                             "(only takes effect with --llm_batch_window_ms)")
+    parser.add_argument("--vqa_api_url", type=str, default=None,
+                        help="VQA tool endpoint for this run. Example: http://localhost:1235/vqa/predict_base64")
     
     args = parser.parse_args()
     
+    # Endpoints are read at call time, so each shard can target its own servers
+    if args.llm_base_url:
+        os.environ["LLM_BASE_URL"] = args.llm_base_url
+    if args.llm_endpoints:
+        os.environ["LLM_ENDPOINTS"] = args.llm_endpoints
+    if args.llm_hedge_after_ms:
+        os.environ["LLM_HEDGE_AFTER_MS"] = str(args.llm_hedge_after_ms)
+    if args.vqa_api_url:
+        os.environ["VQA_API_URL"] = args.vqa_api_url
+    if args.llm_max_connections:
+        configure_connection_pool(args.llm_max_connections)
+    if args.llm_cache:
+        os.environ["LLM_CACHE_PATH"] = args.llm_cache
+        os.environ["LLM_CACHE_MAX_BYTES"] = str(args.llm_cache_max_mb * 1024 * 1024)
+    if args.llm_seed is not None:
+        os.environ["LLM_SEED"] = str(args.llm_seed)
+    if args.llm_batch_window_ms > 0:
+        os.environ["LLM_BATCH_WINDOW_MS"] = str(args.llm_batch_window_ms)
+        os.environ["LLM_MAX_BATCH_SIZE"] = str(args.llm_max_batch_size)
+        if args.llm_prefix_grouping:
+            os.environ["LLM_PREFIX_GROUPING"] = "1"
+    
     # Directly run the selected experiment
     if args.experiment == "full_system":
         experiment = FullSystemVQAXExperiment(
             sample_size=args.samples,
             test_json_path=args.test_json_path,
-            test_image_dir=args.test_image_dir
+            test_image_dir=args.test_image_dir,
+            max_concurrency=args.max_concurrency,
+            resume=args.resume,
+            shard_index=args.shard_index,
+            num_shards=args.num_shards,
+            results_format=args.results_format,
+            sample_timeout=args.sample_timeout,
+            run_time_budget=args.run_time_budget,
+            fused_reasoning=args.fused_reasoning,
+            early_consensus=args.early_consensus,
+            prefetch_tools=args.prefetch_tools,
+            static_tool_plans=args.static_tool_plans
         )
     
     # Run experiment
@@ -6,6 +6,10 @@ echo "Running Full System..."
 # Number of samples to process. Set to 0 to run on the full dataset.
 SAMPLES=3
 
+# Number of samples processed concurrently. Raise this to overlap the
+# LLM server, the VQA API and the GPU tools across samples.
+MAX_CONCURRENCY=1
+
 # Default data paths (relative to the project root).
 # These are used if you followed the default data preparation steps.
 TEST_JSON_PATH="data/ViVQA-X/ViVQA-X_test.json"
@@ -22,4 +26,5 @@ python main.py \
     --experiment full_system \
     --samples "$SAMPLES" \
     --test_json_path "$TEST_JSON_PATH" \
-    --test_image_dir "$TEST_IMAGE_DIR"
\ No newline at end of file
+    --test_image_dir "$TEST_IMAGE_DIR" \
+    --max_concurrency "$MAX_CONCURRENCY"
\ No newline at end of file
@@ -1,7 +1,49 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
+class GenerationConfig(BaseModel):
+    """LLM generation settings for one pipeline node"""
+    temperature: float = Field(default=0.7, description="Sampling temperature.")
+    thinking: bool = Field(default=False, description="Let Qwen3 generate a <think> block before answering.")
+    max_tokens: Optional[int] = Field(default=None, description="Cap on generated tokens.")
+    stop: Optional[List[str]] = Field(default=None, description="Stop sequences.")
+
+    def llm_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for `get_llm`"""
+        return {
+            "temperature": self.temperature,
+            "thinking": self.thinking,
+            "max_tokens": self.max_tokens,
+            "stop": self.stop,
+        }
+
+
+def default_generation() -> Dict[str, GenerationConfig]:
+    """
+    Default settings per analyst node. Every node strips <think> blocks from
+    its output, so thinking is off; output caps match what each node keeps.
+    """
+    return {
+        # Planner: only the tool call (or "Finish") is used
+        "agent": GenerationConfig(temperature=0.2, max_tokens=256),
+        # A few sentences of Vietnamese reasoning
+        "rationale": GenerationConfig(temperature=0.7, max_tokens=256),
+        # Single word / short phrase after "Answer:"
+        "final_reasoning": GenerationConfig(temperature=0.7, max_tokens=32, stop=["\n\n"]),
+        # Rationale followed by the answer line, in one generation; stop before another example
+        # (not at a blank line, which may separate the rationale from "Answer:")
+        "fused_reasoning": GenerationConfig(temperature=0.7, max_tokens=288, stop=["###"]),
+    }
+
+
+class ToolStep(BaseModel):
+    """One call of a static tool plan"""
+    tool: str = Field(description="Name of the tool to call.")
+    args: Dict[str, str] = Field(default_factory=dict,
+                                 description="Argument templates; {question}, {keywords} and {context} are filled in.")
+
+
 class Analyst(BaseModel):
     """Base model for all analysts"""
     name: str = Field(description="Name of the analyst.")
@@ -10,6 +52,15 @@ class Analyst(BaseModel):
     system_prompt: str = Field(description="System prompt for the analyst.")
     final_system_prompt: str = Field(default="", description="Final system prompt for reasoning.")
     rationale_system_prompt: str = Field(default="", description="Rationale system prompt for reasoning.")
+    fused_system_prompt: str = Field(default="", description="System prompt producing the rationale and the answer in one call.")
+    generation: Dict[str, GenerationConfig] = Field(default_factory=default_generation,
+                                                    description="Generation settings per pipeline node.")
+    tool_plan: Optional[List[ToolStep]] = Field(default=None,
+                                                description="Fixed tool calls that replace the LLM planner; None keeps LLM planning.")
+    
+    def generation_for(self, node: str) -> GenerationConfig:
+        """Generation settings of `node`, falling back to the defaults"""
+        return self.generation.get(node) or default_generation()[node]
     
     @property
     def affiliation(self) -> str:
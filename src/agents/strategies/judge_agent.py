@@ -1,7 +1,10 @@
 from bert_score import score as bert_score
 from typing import List, Dict
-from src.models.llm_provider import get_llm
+from src.models.llm_provider import get_llm, invoke_llm
 from src.utils.text_processing import extract_explanation, remove_think_block
+from src.utils.tracing import tracer
+from src.agents.base_agent import GenerationConfig
+from src.utils.prompt_utils import render_prompt
 
 
 class ConsensusJudgeAgent():
@@ -49,11 +52,15 @@ class ConsensusJudgeAgent():
             Explanation:
         """
 
+        # One short explanation line; thinking output would be stripped anyway
+        self.generation = GenerationConfig(temperature=0.7, max_tokens=96)
+
         self.sim_threshold = sim_threshold
         self.min_pairs = min_pairs
         self.lang = "vi"
 
-    def __call__(self, question: str, answer: str, rationales: List[Dict[str, str]]) -> tuple[str, str]:
+    def __call__(self, question: str, answer: str, rationales: List[Dict[str, str]],
+                 fallback_evidence: str = "") -> tuple[str, str]:
 
         # convert list of dict to dict
         agent_results = {k: v for d in rationales for k, v in d.items()}
@@ -62,9 +69,12 @@ class ConsensusJudgeAgent():
         senior_result = agent_results.get("Senior", "")
         manager_result = agent_results.get("Manager", "")
         thinkings = [junior_result, senior_result, manager_result]
-        sim_ok = self._is_consistent(thinkings)
+        # Analysts skipped by early consensus have no rationale; only compare the ones present
+        sim_ok = self._is_consistent([t for t in thinkings if t])
 
         if sim_ok:
+            # A missing evidence slot gets the cheap fallback (e.g. the image caption)
+            thinkings = [t or fallback_evidence for t in thinkings]
             explanation = self._aggregate_explanation(question, answer, thinkings)
             return (answer, explanation)
         else:
@@ -74,20 +84,23 @@ class ConsensusJudgeAgent():
         """
         Trả về True nếu có ít nhất min_pairs cặp thinking có BERTScore F1 >= threshold
         """
+        if len(thinkings) < 2:
+            return False
         refs, cands = [], []
         for i in range(len(thinkings)):
             for j in range(i + 1, len(thinkings)):
                 refs.append(thinkings[i])
                 cands.append(thinkings[j])
 
-        P, R, F1 = bert_score(cands, refs, lang=self.lang, verbose=False)
+        with tracer.span("judge:bertscore"):
+            P, R, F1 = bert_score(cands, refs, lang=self.lang, verbose=False)
         ok_flags = [f.item() >= self.sim_threshold for f in F1]
         ok_count  = sum(ok_flags)
 
         return ok_count >= self.min_pairs
 
     def _aggregate_explanation(self, question: str, answer: str, thinkings: List[str]) -> str:
-        llm = get_llm(temperature=0.7)
+        llm = get_llm(**self.generation.llm_kwargs())
         format_dict = {
             "question": question,
             "answer": answer,
@@ -95,8 +108,8 @@ class ConsensusJudgeAgent():
             "evidence_2": thinkings[1],
             "evidence_3": thinkings[2]
         }
-        system_prompt = self.system_prompt.format(**format_dict)
-        response = llm.invoke(system_prompt)
+        messages = render_prompt("consensus_judge", self.system_prompt, format_dict)
+        response = invoke_llm(llm, messages, node="consensus_judge")
         cleaned_content = remove_think_block(response.content)
         explanation = extract_explanation(cleaned_content)
         return explanation
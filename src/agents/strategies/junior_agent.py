@@ -1,4 +1,4 @@
-from src.agents.base_agent import Analyst
+from src.agents.base_agent import Analyst, ToolStep
 
 class JuniorAgent(Analyst):
     """Junior analyst that uses only VQA tool"""
@@ -8,6 +8,8 @@ class JuniorAgent(Analyst):
             name="Junior",
             description="A junior analyst who uses only the vanilla VQA model to generate candidate answers.",
             tools=["vqa_tool"],
+            # One tool and one step: the planner can only ever call vqa_tool on the question
+            tool_plan=[ToolStep(tool="vqa_tool", args={"question": "{question}"})],
             system_prompt="""
             You are an AI assistant executing a task. Analyze the current state of your progress and decide the next best action.
             
@@ -18,6 +20,13 @@ class JuniorAgent(Analyst):
             ## Task
             Your goal is gather all the information to answer the user's question based on the provided image and context.
             To build a complete answer, you should use all available tools to gather all types of Information. 
+
+            ## Your Decision
+            Based on the information gathered below, carefully review the user's question again.
+            - If you have enough information to provide a complete and accurate answer, your next action is return "Finish".
+            - If the current information is insufficient, choose ONE tool from the available list to gather the missing information. Do not repeat a tool call if you already have the necessary information.
+
+            ## Current Task
             User Question: {question}
             Context: {context}
 
@@ -27,11 +36,6 @@ class JuniorAgent(Analyst):
             ## Information Gathered 
             ### Answer Candidate:
             {answer_candidate}
-
-            ## Your Decision
-            Based on the information you have, carefully review the user's question again.
-            - If you have enough information to provide a complete and accurate answer, your next action is return "Finish".
-            - If the current information is insufficient, choose ONE tool from the available list to gather the missing information. Do not repeat a tool call if you already have the necessary information.
             """,
             rationale_system_prompt="""
                 Your task is to generate a logical explanation in Vietnamese. Do not include a final concluding sentence. Synthesize the visual details from 'Candidates', 'Context'.
@@ -68,6 +72,46 @@ class JuniorAgent(Analyst):
                 Candidates: {candidates}
                 Rationale:
             """,
+            fused_system_prompt="""
+                Your task is to generate a logical explanation in Vietnamese, then the final answer. Do not include a final concluding sentence in the explanation. Synthesize the visual details from 'Candidates', 'Context'.
+                Important: The 'Candidates' list is a suggestion and may be misleading or entirely incorrect.
+                The 'Answer' must follow from the 'Rationale': a single word or short phrase in Vietnamese, matching the language of the Question.
+
+                ### EXAMPLE 1
+                Context: A wooden dining table is shown with a glossy finish.
+                Question: Bàn được làm bằng gì?
+                Candidates: Gỗ (0.92), Kim loại (0.05), Nhựa (0.02), Đá (0.01), Kính (0.00)
+                Rationale: Mô tả về một 'bàn ăn bằng gỗ' (wooden dining table) có bề mặt bóng. Trong các lựa chọn vật liệu, 'Gỗ' là phương án khớp trực tiếp với mô tả này.
+                Answer: Gỗ
+
+                ### EXAMPLE 2
+                Context: A photo of a single banana that has been partially peeled.
+                Question: Quả chuối có đóng không?
+                Candidates: không (0.95), có (0.05), bị thối (0.00), còn xanh (0.00), bằng nhựa (0.00)
+                Rationale: Mô tả về một quả chuối 'đã được bóc một phần' (partially peeled) cho thấy nó không còn ở trạng thái đóng/nguyên vẹn, tương ứng với lựa chọn 'không'.
+                Answer: không
+
+                ### EXAMPLE 3
+                Context: A herd of zebras are gathered on a grassy field.
+                Question: Các con vật đang làm gì?
+                Candidates: Gặm cỏ (0.88), Đứng im (0.09), Chạy (0.02), Uống nước (0.01), Nằm nghỉ (0.00)
+                Rationale: Bối cảnh một đàn ngựa vằn tụ tập trên một cánh đồng cỏ gợi ý hoạt động phổ biến nhất của chúng là gặm cỏ, đây là lựa chọn hợp lý nhất trong các phương án.
+                Answer: Gặm cỏ
+
+                ### EXAMPLE 4
+                Context: A domestic cat with orange fur is sleeping on a sofa.
+                Question: Con vật trong ảnh là gì?
+                Candidates: Mèo (0.90), Chó (0.05), Hổ (0.04), Sư tử (0.01)
+                Rationale: Mô tả về một 'con mèo nhà' (domestic cat) lông màu cam. Trong các lựa chọn, 'Mèo' là phương án nhận dạng chính xác loài vật này.
+                Answer: Mèo
+                ### END OF EXAMPLES
+
+                ### Now solve the new task
+                Context: {context}
+                Question: {question}
+                Candidates: {candidates}
+                Rationale:
+            """,
             final_system_prompt="""
                 You are an visual-question-answering assistant that generates the most accurate answer based on evidence.
                 For each task you receive:
@@ -1,5 +1,5 @@
 # src/agents/manager_agent.py
-from src.agents.base_agent import Analyst
+from src.agents.base_agent import Analyst, GenerationConfig, default_generation
 
 class ManagerAgent(Analyst):
     """Manager analyst with access to all tools including LLM-based knowledge generation"""
@@ -9,6 +9,12 @@ class ManagerAgent(Analyst):
             name="Manager",
             description="A manager analyst with access to all tools including LLM-based knowledge generation.",
             tools=["vqa_tool", "wikipedia", "analyze_image_object"],
+            # The rationale synthesizes more evidence sources than the other analysts
+            generation={
+                **default_generation(),
+                "rationale": GenerationConfig(temperature=0.7, max_tokens=384),
+                "fused_reasoning": GenerationConfig(temperature=0.7, max_tokens=416, stop=["###"]),
+            },
             system_prompt = """
             You are an AI assistant executing a task. Analyze the current state of your progress and decide the next best action.
             
@@ -20,6 +26,13 @@ class ManagerAgent(Analyst):
             ## Task
             Your goal is gather all the information to answer the user's question based on the provided image and context.
             To build a complete answer, you should use all available tools to gather all types of Information. 
+
+            ## Your Decision
+            Based on the information gathered below, carefully review the user's question again.
+            - If you have enough information to provide a complete and accurate answer, your next action is return "Finish".
+            - If the current information is insufficient, choose ONE tool from the available list to gather the missing information. Do not repeat a tool call if you already have the necessary information.
+
+            ## Current Task
             User Question: {question}
             Context: {context}
 
@@ -35,11 +48,6 @@ class ManagerAgent(Analyst):
 
             ### Factual Knowledge:
             {kbs_knowledge}
-
-            ## Your Decision
-            Based on the information you have, carefully review the user's question again.
-            - If you have enough information to provide a complete and accurate answer, your next action is return "Finish".
-            - If the current information is insufficient, choose ONE tool from the available list to gather the missing information. Do not repeat a tool call if you already have the necessary information.
             """,
 
 
@@ -88,6 +96,56 @@ class ManagerAgent(Analyst):
                 Object_Analysis: {Object_Analysis}
                 Rationale:
             """,
+            fused_system_prompt="""
+                Your task is to generate a logical explanation in Vietnamese, then the final answer. Do not include a final concluding sentence in the explanation. Synthesize the visual details from 'Candidates', 'Context', 'Object_Analysis', with the facts from 'KBs_Knowledge'.
+                Important: The 'Candidates' list is a suggestion and may be misleading or entirely incorrect.
+                The 'Answer' must follow from the 'Rationale': a single word or short phrase in Vietnamese, matching the language of the Question.
+
+                ### EXAMPLE 1
+                Context: A wooden dining table is shown with a glossy finish.
+                Question: Bàn được làm bằng gì?
+                Candidates: Gỗ (0.92), Kim loại (0.05), Nhựa (0.02), Đá (0.01), Kính (0.00)
+                KBs_Knowledge: Materials that are brown, smooth, and shiny are often polished or varnished wood.
+                Object_Analysis: The object is a table. Its surface is observed to be brown, smooth, and shiny.
+                Rationale: Bề mặt của bàn có màu nâu, mịn và sáng bóng, là đặc điểm của gỗ.
+                Answer: Gỗ
+
+                ### EXAMPLE 2
+                Context: A photo of a single banana that has been partially peeled.
+                Question: Quả chuối có đóng không?
+                Candidates: không (0.95), có (0.05), bị thối (0.00), còn xanh (0.00), bằng nhựa (0.00)
+                KBs_Knowledge: A banana is considered 'not closed' or 'open' when its peel is removed to expose the edible fruit inside.
+                Object_Analysis: The object is a banana with its yellow peel partially pulled back. The inner, edible part of the fruit is visible.
+                Rationale: Quả chuối đã được bóc vỏ một phần, làm lộ ra phần ruột bên trong.
+                Answer: không
+
+                ### EXAMPLE 3
+                Context: A herd of zebras are gathered on a grassy field.
+                Question: Các con vật đang làm gì?
+                Candidates: Gặm cỏ (0.88), Đứng im (0.09), Chạy (0.02), Uống nước (0.01), Nằm nghỉ (0.00)
+                KBs_Knowledge: Herbivores like zebras eat grass by lowering their mouths to the ground. This action is called grazing.
+                Object_Analysis: A group of zebras is visible. Their heads are lowered, and their mouths are positioned close to the ground where the grass is.
+                Rationale: Những con ngựa vằn đang cúi đầu và miệng của chúng ở gần bãi cỏ.
+                Answer: Gặm cỏ
+
+                ### EXAMPLE 4 
+                Context: Two police officers on horseback patrolling a city street.
+                Question: Người đàn ông đang làm gì?
+                Candidates: đi bộ (0.65), đứng im (0.20), nói chuyện (0.10), chạy (0.05)
+                KBs_Knowledge: The action of sitting on and controlling a horse is called 'riding a horse' (cưỡi ngựa).
+                Object_Analysis: The men are sitting on top of horses.
+                Rationale: Phân tích hình ảnh cho thấy hai người đàn ông đang ngồi trên lưng ngựa.
+                Answer: cưỡi ngựa
+                ### END OF EXAMPLES
+
+                ### Now solve the new task
+                Context: {context}
+                Question: {question}
+                Candidates: {candidates}
+                KBs_Knowledge: {KBs_Knowledge}
+                Object_Analysis: {Object_Analysis}
+                Rationale:
+            """,
             final_system_prompt="""
                 You are an visual-question-answering assistant that generates the most accurate answer based on evidence.
                 For each task you receive:
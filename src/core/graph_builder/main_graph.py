@@ -1,39 +1,74 @@
-from typing import Dict, Any
+from typing import Dict, Any, Sequence
 from langgraph.graph import StateGraph, END, START
 
 from src.core.nodes.caption_node import caption_node
 from src.core.state import ViReAgentState
 from src.core.graph_builder.sub_graph import SubGraphBuilder
 from src.core.nodes.voting_node import voting_node
+from src.core.nodes.analysts_node import early_consensus_analysts_node
+from src.core.nodes.prefetch_node import prefetch_node
 from src.core.nodes.consensus_judge import consensus_judge_node
 
 class MainGraphBuilder:
     """Builder for the main multi-agent workflow"""
     
-    def __init__(self, tools_registry: Dict[str, Any]):
+    def __init__(self, tools_registry: Dict[str, Any], fused_reasoning: bool = False,
+                 early_consensus: bool = False, prefetch_tools: Sequence[str] = (),
+                 static_tool_plans: bool = False):
         self.tools_registry = tools_registry
-        self.subgraph_builder = SubGraphBuilder(tools_registry)
+        self.subgraph_builder = SubGraphBuilder(tools_registry, fused_reasoning=fused_reasoning,
+                                                static_tool_plans=static_tool_plans)
+        # Stop waiting for analysts once the weighted vote can no longer change
+        self.early_consensus = early_consensus
+        # Tools started speculatively alongside the caption (see prefetch_node)
+        self.prefetch_tools = tuple(prefetch_tools)
         
     def create_main_workflow(self):
         main = StateGraph(ViReAgentState)
 
         main.add_node("caption", caption_node)
 
-        main.add_node("junior_analyst", self.subgraph_builder.create_junior_subgraph())
-        main.add_node("senior_analyst", self.subgraph_builder.create_senior_subgraph())
-        main.add_node("manager_analyst", self.subgraph_builder.create_manager_subgraph())
-
         main.add_node("voting", voting_node)
         main.add_node("consensus_judge", consensus_judge_node)
 
         main.add_edge(START,          "caption")
-        main.add_edge("caption",      "junior_analyst")
-        main.add_edge("caption",      "senior_analyst")
-        main.add_edge("caption",      "manager_analyst")
 
-        main.add_edge("junior_analyst", "voting")
-        main.add_edge("senior_analyst", "voting")
-        main.add_edge("manager_analyst", "voting")
+        # The analysts start once the caption is ready and the prefetches are registered
+        upstream = "caption"
+        if self.prefetch_tools:
+            def prefetch(state, config):
+                return prefetch_node(state, config, self.tools_registry, self.prefetch_tools)
+
+            main.add_node("prefetch", prefetch)
+            main.add_edge(START, "prefetch")
+            upstream = ["caption", "prefetch"]
+
+        if self.early_consensus:
+            # One node drives the three subgraphs and cancels the ones the vote no longer needs
+            subgraphs = {
+                "Junior": self.subgraph_builder.create_junior_subgraph(),
+                "Senior": self.subgraph_builder.create_senior_subgraph(),
+                "Manager": self.subgraph_builder.create_manager_subgraph(),
+            }
+
+            def analysts_node(state, config):
+                return early_consensus_analysts_node(state, config, subgraphs)
+
+            main.add_node("analysts", analysts_node)
+            main.add_edge(upstream, "analysts")
+            main.add_edge("analysts", "voting")
+        else:
+            main.add_node("junior_analyst", self.subgraph_builder.create_junior_subgraph())
+            main.add_node("senior_analyst", self.subgraph_builder.create_senior_subgraph())
+            main.add_node("manager_analyst", self.subgraph_builder.create_manager_subgraph())
+
+            main.add_edge(upstream,       "junior_analyst")
+            main.add_edge(upstream,       "senior_analyst")
+            main.add_edge(upstream,       "manager_analyst")
+
+            main.add_edge("junior_analyst", "voting")
+            main.add_edge("senior_analyst", "voting")
+            main.add_edge("manager_analyst", "voting")
 
         main.add_edge("voting", "consensus_judge")
         main.add_edge("consensus_judge", END)
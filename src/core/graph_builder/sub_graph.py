@@ -1,7 +1,10 @@
 from typing import Dict, Any, Type
 from langgraph.graph import StateGraph, END, START
 
-from src.core.nodes.subgraph_node import tool_node, call_agent_node, final_reasoning_node, should_continue, rationale_node
+from src.core.nodes.subgraph_node import (
+    tool_node, call_agent_node, final_reasoning_node, should_continue, rationale_node, fused_reasoning_node,
+    plan_node
+)
 from src.core.state import (    
     ViReJuniorState, 
     ViReSeniorState, 
@@ -17,8 +20,13 @@ from src.agents.strategies.manager_agent import ManagerAgent
 class SubGraphBuilder:
     """Builder for individual agent subgraphs"""
     
-    def __init__(self, tools_registry: Dict[str, Any]):
+    def __init__(self, tools_registry: Dict[str, Any], fused_reasoning: bool = False,
+                 static_tool_plans: bool = False):
         self.tools_registry = tools_registry
+        # Rationale and answer from one LLM call instead of two
+        self.fused_reasoning = fused_reasoning
+        # Analysts with a tool_plan run it instead of the LLM planner
+        self.static_tool_plans = static_tool_plans
     
     def create_agent_subgraph(self, state_class: Type, analyst_instance, output_state) -> StateGraph:
         """Create a subgraph for a specific agent type with analyst instance"""
@@ -28,31 +36,53 @@ class SubGraphBuilder:
             state["analyst"] = analyst_instance 
             return call_agent_node(state, config, self.tools_registry)
         
-        def tools_node(state):
-            return tool_node(state, self.tools_registry)
+        def tools_node(state, config):
+            return tool_node(state, self.tools_registry, config)
         
         def final_reasoning_with_analyst(state):
             return final_reasoning_node(state)
         
-        # Add nodes
-        workflow.add_node("agent", agent_node)
-        workflow.add_node("tools", tools_node)
-        workflow.add_node("rationale", rationale_node)
-        workflow.add_node("final_reasoning", final_reasoning_with_analyst)
+        def plan_with_analyst(state):
+            state["analyst"] = analyst_instance
+            return plan_node(state)
         
-        # Set entry point
-        workflow.set_entry_point("agent")
+        reasoning_entry = "fused_reasoning" if self.fused_reasoning else "rationale"
+        use_tool_plan = self.static_tool_plans and bool(analyst_instance.tool_plan)
         
-        # Add conditional edges
-        workflow.add_conditional_edges("agent", should_continue, {
-            "continue": "tools",
-            "rationale": "rationale"
-        })
+        # Add nodes
+        if use_tool_plan:
+            workflow.add_node("plan", plan_with_analyst)
+        else:
+            workflow.add_node("agent", agent_node)
+        workflow.add_node("tools", tools_node)
+        if self.fused_reasoning:
+            workflow.add_node("fused_reasoning", fused_reasoning_node)
+        else:
+            workflow.add_node("rationale", rationale_node)
+            workflow.add_node("final_reasoning", final_reasoning_with_analyst)
         
-        # Add edges
-        workflow.add_edge("tools", "agent")
-        workflow.add_edge("rationale", "final_reasoning")
-        workflow.add_edge("final_reasoning", END)
+        if use_tool_plan:
+            # plan -> tools -> reasoning: no planner LLM call at all
+            workflow.set_entry_point("plan")
+            workflow.add_edge("plan", "tools")
+            workflow.add_edge("tools", reasoning_entry)
+        else:
+            # Set entry point
+            workflow.set_entry_point("agent")
+            
+            # Add conditional edges
+            workflow.add_conditional_edges("agent", should_continue, {
+                "continue": "tools",
+                "rationale": reasoning_entry
+            })
+            
+            # Add edges
+            workflow.add_edge("tools", "agent")
+        if self.fused_reasoning:
+            workflow.add_edge("fused_reasoning", END)
+        else:
+            workflow.add_edge("rationale", "final_reasoning")
+            workflow.add_edge("final_reasoning", END)
         
         return workflow
     
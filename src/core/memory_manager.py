@@ -1,18 +1,39 @@
+import os
 from typing import Dict, Any, Optional
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.base import BaseCheckpointSaver
 
+# Disk-backed sessions when set, e.g. SESSION_DB_PATH=sessions.sqlite
+SESSION_DB_PATH = os.environ.get("SESSION_DB_PATH")
+SESSION_MAX_CHECKPOINTS = int(os.environ.get("SESSION_MAX_CHECKPOINTS", "10"))
+SESSION_TTL_SECONDS = float(os.environ.get("SESSION_TTL_SECONDS", "0")) or None
+SESSION_COMPACTION_INTERVAL = float(os.environ.get("SESSION_COMPACTION_INTERVAL", "3600"))
+
 class SessionMemory:
-    
+
     def __init__(self, checkpointer: Optional[BaseCheckpointSaver] = None):
         self.checkpointer = checkpointer or MemorySaver()
-    
+
+    @classmethod
+    def sqlite(cls, path: str, max_checkpoints_per_thread: Optional[int] = SESSION_MAX_CHECKPOINTS,
+               ttl_seconds: Optional[float] = SESSION_TTL_SECONDS,
+               compaction_interval: Optional[float] = SESSION_COMPACTION_INTERVAL,
+               **kwargs) -> "SessionMemory":
+        """Session memory persisted in a SQLite file, with bounded retention and periodic compaction"""
+        # Imported here so the in-memory default does not depend on the SQLite saver
+        from src.core.sqlite_checkpointer import SqliteCheckpointSaver
+        checkpointer = SqliteCheckpointSaver(path, max_checkpoints_per_thread=max_checkpoints_per_thread,
+                                             ttl_seconds=ttl_seconds, **kwargs)
+        if compaction_interval:
+            checkpointer.start_compaction(compaction_interval)
+        return cls(checkpointer)
+
     def create_thread_config(self, thread_id: str = "default") -> Dict[str, Any]:
         """Create thread configuration for session"""
         return {"configurable": {"thread_id": thread_id}}
-    
+
     def get_checkpointer(self) -> BaseCheckpointSaver:
         """Get the checkpointer instance"""
         return self.checkpointer
 
-session_memory = SessionMemory()
\ No newline at end of file
+session_memory = SessionMemory.sqlite(SESSION_DB_PATH) if SESSION_DB_PATH else SessionMemory()
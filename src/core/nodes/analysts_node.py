@@ -0,0 +1,75 @@
+import contextvars
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict
+
+from langchain_core.runnables import RunnableConfig
+
+from src.core.nodes.voting_node import is_vote_decided, normalize_answer_for_voting
+from src.utils.cancellation import CancelToken, SampleCancelled, cancel_scope, cancellable, current_token, remaining_time
+from src.utils.tracing import traced
+
+# State keys every analyst subgraph reads from the main graph
+SUBGRAPH_INPUT_KEYS = ("question", "image", "image_id", "image_caption")
+
+
+def _run_analyst(subgraph, subgraph_input: Dict[str, Any], config: RunnableConfig, token: CancelToken):
+    with cancel_scope(token):
+        return subgraph.invoke(subgraph_input, config)
+
+
+@cancellable
+@traced("node:analysts")
+def early_consensus_analysts_node(state, config: RunnableConfig, subgraphs: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run the analyst subgraphs in parallel and stop as soon as the weighted
+    vote is settled.
+
+    Each analyst runs under a child of the sample's cancel token. Whenever an
+    analyst finishes, the answers so far are checked with `is_vote_decided`;
+    once no outstanding analyst can change the outcome, the outstanding ones
+    are cancelled and only the finished analysts' results are returned.
+    Cancellation skips their remaining tool / LLM steps; the node returns
+    once the step each of them was in has finished.
+    """
+    subgraph_input = {key: state[key] for key in SUBGRAPH_INPUT_KEYS if key in state}
+    parent = current_token()
+    deadline = parent.deadline if parent is not None else None
+    tokens = {name: CancelToken(deadline=deadline, parent=parent) for name in subgraphs}
+
+    executor = ThreadPoolExecutor(max_workers=len(subgraphs), thread_name_prefix="analyst")
+    futures = {
+        executor.submit(contextvars.copy_context().run, _run_analyst,
+                        subgraph, subgraph_input, config, tokens[name]): name
+        for name, subgraph in subgraphs.items()
+    }
+
+    updates = {"results": [], "rationales": [], "skipped_analysts": []}
+    answers: Dict[str, str] = {}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=remaining_time(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise SampleCancelled("sample deadline exceeded")
+            # Merge in the analysts' declaration order, whatever the completion order
+            for future in sorted(done, key=lambda f: list(subgraphs).index(futures[f])):
+                output = future.result()
+                updates["results"] += output.get("results") or []
+                updates["rationales"] += output.get("rationales") or []
+                answer = {k: v for d in output.get("results") or [] for k, v in d.items()}.get(futures[future], "")
+                answers[futures[future]] = normalize_answer_for_voting(answer)
+
+            if pending and is_vote_decided(answers) is not None:
+                skipped = [futures[f] for f in pending]
+                print(f"Early consensus on '{is_vote_decided(answers)}', skipping: {', '.join(skipped)}")
+                updates["skipped_analysts"] = skipped
+                break
+    finally:
+        # Outstanding analysts stop at their next cancellation check
+        for future in pending:
+            tokens[futures[future]].cancel("vote already decided")
+        # A call already in flight cannot be interrupted: wait for it to finish (within the
+        # sample's deadline) so it does not overlap the next sample's requests
+        wait(pending, timeout=remaining_time())
+        executor.shutdown(wait=False, cancel_futures=True)
+    return updates
@@ -1,6 +1,17 @@
 from src.tools.dam_tools import dam_caption_image
+from src.utils.tracing import traced
+from src.utils.cancellation import cancellable
+from src.utils.artifact_cache import artifact_cache
 
 
+@cancellable
+@traced("node:caption")
 def caption_node(state):
-        caption = dam_caption_image(state.get("image"))
+        image = state.get("image")
+        image_id = state.get("image_id")
+        if image_id:
+            # One caption per image, shared by every question on it
+            caption = artifact_cache.get_or_compute(image_id, "caption", lambda: dam_caption_image(image))
+        else:
+            caption = dam_caption_image(image)
         return {"image_caption": caption, "phase": "prevote"}
\ No newline at end of file
@@ -1,9 +1,14 @@
 from src.agents.strategies.judge_agent import ConsensusJudgeAgent
 from typing import Dict
+from src.utils.tracing import traced
+from src.utils.cancellation import cancellable
 
+@cancellable
+@traced("node:consensus_judge")
 def consensus_judge_node(state) -> Dict[str, str]:
     judge = ConsensusJudgeAgent()
-    final_answer, explanation = judge(state["question"], state["final_answer"], state["rationales"])
+    final_answer, explanation = judge(state["question"], state["final_answer"], state["rationales"],
+                                      fallback_evidence=state.get("image_caption", ""))
 
     updates = {
         "final_answer": final_answer,
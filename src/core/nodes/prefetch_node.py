@@ -0,0 +1,67 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Sequence
+
+from langchain_core.runnables import RunnableConfig
+
+from src.core.nodes.subgraph_node import _image_arg
+from src.utils.cancellation import cancellable
+from src.utils.text_processing import extract_keywords
+from src.utils.tool_memo import ToolErrorResult, ToolMemo, get_tool_memo, is_tool_error
+from src.utils.tracing import tracer, traced
+
+# Tools whose first call can be predicted from the question alone
+PREFETCHABLE_TOOLS = ("vqa_tool", "wikipedia")
+_prefetch_executor = ThreadPoolExecutor(max_workers=len(PREFETCHABLE_TOOLS), thread_name_prefix="prefetch")
+
+
+def configure_prefetch_executor(max_concurrency: int):
+    """Size the shared prefetch pool so every sample in flight can prefetch all its tools at once"""
+    global _prefetch_executor
+    old, _prefetch_executor = _prefetch_executor, ThreadPoolExecutor(
+        max_workers=len(PREFETCHABLE_TOOLS) * max(1, max_concurrency), thread_name_prefix="prefetch")
+    old.shutdown(wait=False)
+
+
+def _prefetch_args(tool_name: str, state) -> Dict[str, Any]:
+    """Arguments the planners typically use for their first call of `tool_name`"""
+    if tool_name == "vqa_tool":
+        return {"image": _image_arg(state), "question": state["question"]}
+    return {"query": extract_keywords(state["question"])}
+
+
+def _run_prefetch(tool, tool_name: str, args: Dict[str, Any]):
+    with tracer.span(f"prefetch:{tool_name}"):
+        result = tool.invoke(args)
+    # A failed prefetch must not be served as the answer: the analysts fall back to their own call
+    if is_tool_error(result):
+        raise ToolErrorResult(result)
+    return result
+
+
+@cancellable
+@traced("node:prefetch")
+def prefetch_node(state, config: RunnableConfig, tools_registry: Dict[str, Any],
+                  prefetch_tools: Sequence[str]) -> Dict[str, Any]:
+    """
+    Start the predictable tool calls of the sample while the caption is
+    generated.
+
+    The calls run in the background and their futures go into the request's
+    tool memo, so an analyst whose planner asks for the same call gets the
+    (possibly already finished) result instead of a new request. The node
+    itself returns at once.
+    """
+    memo = get_tool_memo(config)
+    if memo is None:
+        return {}
+    for tool_name in prefetch_tools:
+        if tool_name not in tools_registry:
+            continue
+        args = _prefetch_args(tool_name, state)
+        key = ToolMemo.make_key(tool_name, args, state.get("image_id"))
+        future = _prefetch_executor.submit(contextvars.copy_context().run,
+                                           _run_prefetch, tools_registry[tool_name], tool_name, args)
+        if not memo.put(key, future):
+            future.cancel()
+    return {}
@@ -1,70 +1,147 @@
-from typing import Union, Dict, Any
+from typing import Union, Dict, Any, Tuple
+import contextvars
 import json
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import ToolMessage, AIMessage
 from src.core.state import ViReJuniorState, ViReSeniorState, ViReManagerState
-from src.models.llm_provider import get_llm
+from src.models.llm_provider import get_llm, invoke_llm
 from src.utils.tools_utils import _process_knowledge_result
-import re
-from src.utils.image_processing import pil_to_base64
-from src.utils.text_processing import extract_answer, remove_think_block, extract_rationale
+from src.utils.image_processing import image_to_base64
+from src.utils.text_processing import extract_answer, remove_think_block, extract_rationale, extract_rationale_and_answer, extract_keywords
+from src.utils.tracing import tracer, traced
+from src.utils.cancellation import cancellable, check_cancelled, SampleCancelled
+from src.utils.artifact_cache import artifact_cache
+from src.utils.prompt_utils import render_prompt, template_name
+from src.utils.usage_tracking import record_tool_iteration
+from src.utils.tool_memo import ToolMemo, get_tool_memo
 
-def tool_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState], 
-              tools_registry: Dict[str, Any]) -> Dict[str, Any]:
-    """Process tool calls and update state"""
-    tool_calls = getattr(state["messages"][-1], "tool_calls", [])
-    count_of_tool_calls = state.get("count_of_tool_calls", 0)
-    updates = {"messages": [], "count_of_tool_calls": count_of_tool_calls + len(tool_calls)}
+# Extra tool calls of one planner message, beyond the first, that run at the same time per sample
+TOOL_CALLS_PER_SAMPLE = 4
+_tool_executor = ThreadPoolExecutor(max_workers=TOOL_CALLS_PER_SAMPLE, thread_name_prefix="tool-call")
 
-    for tool_call in tool_calls:
-        tool_name = tool_call["name"]
-        print("Agent: ", state["analyst"].name, "tool_name: ", tool_name, "args: ", tool_call["args"])
-        
-        try:
+def configure_tool_executor(max_concurrency: int):
+    """Size the shared tool-call pool so concurrent samples do not queue behind each other"""
+    global _tool_executor
+    old, _tool_executor = _tool_executor, ThreadPoolExecutor(
+        max_workers=TOOL_CALLS_PER_SAMPLE * max(1, max_concurrency), thread_name_prefix="tool-call")
+    old.shutdown(wait=False)
+
+def _image_arg(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> str:
+    """Image argument of the image tools: the image store handle, which the tools resolve themselves"""
+    image = state.get("image")
+    return image if isinstance(image, str) else image_to_base64(image)
+
+def _invoke_tool(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState],
+                 tools_registry: Dict[str, Any], tool_name: str, args: Dict[str, Any],
+                 memo: Union[ToolMemo, None]) -> Any:
+    """Invoke a tool, through the request's tool memo when there is one"""
+    call = lambda: tools_registry[tool_name].invoke(args)
+    if memo is None:
+        return call()
+    return memo.get_or_call(ToolMemo.make_key(tool_name, args, state.get("image_id")), call)
+
+def _run_tool_call(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState],
+                   tools_registry: Dict[str, Any], tool_call: Dict[str, Any], index: int,
+                   memo: Union[ToolMemo, None]) -> Tuple[ToolMessage, Dict[str, Any]]:
+    """Run one tool call; returns its ToolMessage and its state updates"""
+    tool_name = tool_call["name"]
+    print("Agent: ", state["analyst"].name, "tool_name: ", tool_name, "args: ", tool_call["args"])
+    updates = {}
+    
+    check_cancelled()
+    try:
+        with tracer.span(f"tool:{tool_name}", agent=state["analyst"].name):
             if tool_name == "vqa_tool" or tool_name == "lm_knowledge" or tool_name == "analyze_image_object":
-                tool_call['args']['image'] = state.get("image")
-                tool_call["args"]["image"] = pil_to_base64(tool_call['args']['image']) 
-                result = tools_registry[tool_name].invoke(tool_call["args"])
+                tool_call["args"]["image"] = _image_arg(state)
+                if tool_name == "analyze_image_object" and state.get("image_id"):
+                    # Object analyses depend only on the image and the object name
+                    object_key = str(tool_call["args"].get("object_name", "")).strip().lower()
+                    result = artifact_cache.get_or_compute(
+                        state["image_id"], f"object_analysis:{object_key}",
+                        lambda: _invoke_tool(state, tools_registry, tool_name, tool_call["args"], memo)
+                    )
+                else:
+                    result = _invoke_tool(state, tools_registry, tool_name, tool_call["args"], memo)
                 if tool_name == "vqa_tool":
                     updates["answer_candidate"] = result
                 elif tool_name == "lm_knowledge":
                     updates["lms_knowledge"] = [result]
                 elif tool_name == "analyze_image_object":
                     updates["object_analysis"] = [result]
-                
+            
             elif tool_name in ["arxiv", "wikipedia"]:
-                raw_result = tools_registry[tool_name].invoke(tool_call["args"])
+                raw_result = _invoke_tool(state, tools_registry, tool_name, tool_call["args"], memo)
                 print(f"Agent: {state['analyst'].name} - Tool: {tool_name}")
-                processed_result = _process_knowledge_result(raw_result, tool_name)
-                updates["kbs_knowledge"] = [processed_result]
+                result = _process_knowledge_result(raw_result, tool_name)
+                updates["kbs_knowledge"] = [result]
             else:
                 result = f"Unknown tool: {tool_name}"
 
             # Remove image data from result because it's too large
-            result_content = processed_result if 'processed_result' in locals() else result
-            if isinstance(result_content, dict) and 'image' in result_content:
-                result_content = {k: v for k, v in result_content.items() if k != 'image'}
-            
-            updates["messages"].append(
-                ToolMessage(
-                    content=json.dumps(result_content),
-                    name=tool_name,
-                    tool_call_id=tool_call["id"],
-                )
-            )
-        except Exception as e:
-            print(f"Error processing tool {tool_name}: {e}")
-            tool_call_id = tool_call.get("id", f"call_{tool_name}_error_{len(updates['messages'])}")
-            updates["messages"].append(
-                ToolMessage(
-                    content=f"Error: {str(e)}", 
-                    name=tool_name,
-                    tool_call_id=tool_call_id
-                )
-            )
+            if isinstance(result, dict) and 'image' in result:
+                result = {k: v for k, v in result.items() if k != 'image'}
+        
+        message = ToolMessage(
+            content=json.dumps(result),
+            name=tool_name,
+            tool_call_id=tool_call["id"],
+        )
+    except SampleCancelled:
+        # A cancelled sample stops here instead of going on to the reasoning nodes
+        raise
+    except Exception as e:
+        print(f"Error processing tool {tool_name}: {e}")
+        tool_call_id = tool_call.get("id", f"call_{tool_name}_error_{index}")
+        message = ToolMessage(
+            content=f"Error: {str(e)}", 
+            name=tool_name,
+            tool_call_id=tool_call_id
+        )
+        updates = {}
+    return message, updates
+
+@cancellable
+@traced("node:tools")
+def tool_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState], 
+              tools_registry: Dict[str, Any], config: RunnableConfig = None) -> Dict[str, Any]:
+    """Process tool calls and update state"""
+    # Duplicate calls within and across the analyst subgraphs share one result
+    memo = get_tool_memo(config)
+    tool_calls = getattr(state["messages"][-1], "tool_calls", [])
+    count_of_tool_calls = state.get("count_of_tool_calls", 0)
+    updates = {"messages": [], "count_of_tool_calls": count_of_tool_calls + len(tool_calls)}
+    record_tool_iteration(state["analyst"].name)
+
+    # Independent calls run concurrently: the first on this thread, the others on the
+    # shared pool, each in a copy of the sample's context
+    futures = [
+        _tool_executor.submit(contextvars.copy_context().run,
+                              _run_tool_call, state, tools_registry, tool_call, i, memo)
+        for i, tool_call in enumerate(tool_calls) if i > 0
+    ]
+    try:
+        outcomes = [_run_tool_call(state, tools_registry, tool_call, 0, memo)
+                    for tool_call in tool_calls[:1]]
+        outcomes += [future.result() for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()
+
+    # Merge in call order, so the result does not depend on completion order
+    for message, call_updates in outcomes:
+        updates["messages"].append(message)
+        for key, value in call_updates.items():
+            if isinstance(value, list):
+                # Duplicate calls in one message contribute their result once
+                updates[key] = updates.get(key, []) + [v for v in value if v not in updates.get(key, [])]
+            else:
+                updates[key] = value
     return updates
 
 
+@cancellable
+@traced("node:agent")
 def call_agent_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState],
                    config: RunnableConfig,
                    tools_registry: Dict[str, Any]) -> Dict[str, Any]:
@@ -72,10 +149,7 @@ def call_agent_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerSt
     tools = state["analyst"].tools
     tools = [tools_registry[tool] for tool in tools if tool in tools_registry]
     
-    llm = get_llm(with_tools=tools, temperature=0.2)
-    base_prompt = state["analyst"].system_prompt
-    placeholders = re.findall(r'\{(\w+)\}', base_prompt)
-    
+    llm = get_llm(with_tools=tools, **state["analyst"].generation_for("agent").llm_kwargs())
     # Expanded format_values to include current state information
     format_values = {
         'question': state.get('question', ''),
@@ -87,11 +161,10 @@ def call_agent_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerSt
         'lms_knowledge': "\n".join(state.get('lms_knowledge', [])),
     }
     
-    format_dict = {key: format_values[key] for key in placeholders if key in format_values}
-    formatted_prompt = base_prompt.format(**format_dict)
-
-    messages = [{"role": "system", "content": formatted_prompt}]
-    response = llm.invoke(messages, config)
+    # Static instructions as the system message, per-request fields last
+    messages = render_prompt(template_name("agent", state["analyst"].name),
+                             state["analyst"].system_prompt, format_values)
+    response = invoke_llm(llm, messages, config, node="agent", agent=state["analyst"].name)
     cleaned_content = remove_think_block(response.content)
     
     # Create clean AIMessage preserving tool_calls
@@ -105,9 +178,35 @@ def call_agent_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerSt
         "analyst": state["analyst"]
     }
 
+@cancellable
+@traced("node:plan")
+def plan_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> Dict[str, Any]:
+    """Emit the analyst's static tool plan as one tool-call message, without an LLM call"""
+    fields = {
+        'question': state.get('question', ''),
+        'keywords': extract_keywords(state.get('question', '')),
+        'context': state.get('image_caption', ''),
+    }
+    # All calls in one message, so tool_node runs them concurrently
+    tool_calls = [
+        {
+            "name": step.tool,
+            "args": {name: template.format(**fields) for name, template in step.args.items()},
+            "id": f"plan_{state['analyst'].name}_{i}",
+            "type": "tool_call",
+        }
+        for i, step in enumerate(state["analyst"].tool_plan)
+    ]
+    return {
+        "messages": [AIMessage(content="", tool_calls=tool_calls)],
+        "analyst": state["analyst"]
+    }
+
+@cancellable
+@traced("node:rationale")
 def rationale_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> Dict[str, Any]:
     """Rationale node to generate rationale"""
-    llm = get_llm(temperature=0.7)
+    llm = get_llm(**state["analyst"].generation_for("rationale").llm_kwargs())
     format_values = {
             'context': state.get("image_caption", ""),
             'question': state.get("question", ""),
@@ -117,8 +216,9 @@ def rationale_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerSta
             'Object_Analysis': "\n".join(state.get("object_analysis", []))
     }
 
-    rationale_system_prompt = state["analyst"].rationale_system_prompt.format(**format_values)
-    rationale_response = llm.invoke(rationale_system_prompt)
+    messages = render_prompt(template_name("rationale", state["analyst"].name),
+                             state["analyst"].rationale_system_prompt, format_values)
+    rationale_response = invoke_llm(llm, messages, node="rationale", agent=state["analyst"].name)
     
     cleaned_content = remove_think_block(rationale_response.content)
     rationale = extract_rationale(cleaned_content)
@@ -131,12 +231,10 @@ def rationale_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerSta
         "rationales": [{state["analyst"].name: rationale}]
     }
 
+@cancellable
+@traced("node:final_reasoning")
 def final_reasoning_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> Dict[str, Any]:
     """Final reasoning node to synthesize results"""
-    # Auto-detect placeholders từ final_system_prompt
-    base_prompt = state["analyst"].final_system_prompt
-    placeholders = re.findall(r'\{(\w+)\}', base_prompt)
-
     format_values = {
             'context': state.get("image_caption", ""),
             'question': state.get("question", ""),
@@ -145,14 +243,12 @@ def final_reasoning_node(state: Union[ViReJuniorState, ViReSeniorState, ViReMana
     }
 
     print("agent: ", state["analyst"].name, "state: ", format_values)
-    # Chỉ format với placeholders có trong prompt
-    format_dict = {key: format_values[key] for key in placeholders if key in format_values}
-    
-    final_system_prompt = base_prompt.format(**format_dict)
+    messages = render_prompt(template_name("final_reasoning", state["analyst"].name),
+                             state["analyst"].final_system_prompt, format_values)
     
-    llm = get_llm(temperature=0.7)
+    llm = get_llm(**state["analyst"].generation_for("final_reasoning").llm_kwargs())
     
-    final_response = llm.invoke(final_system_prompt)
+    final_response = invoke_llm(llm, messages, node="final_reasoning", agent=state["analyst"].name)
     cleaned_content = remove_think_block(final_response.content)
     answer = extract_answer(cleaned_content)
     print("agent: ", state["analyst"].name, "answer: ", answer)
@@ -161,6 +257,40 @@ def final_reasoning_node(state: Union[ViReJuniorState, ViReSeniorState, ViReMana
     }
 
 
+@cancellable
+@traced("node:fused_reasoning")
+def fused_reasoning_node(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> Dict[str, Any]:
+    """Generate the rationale and the final answer in a single LLM call"""
+    llm = get_llm(**state["analyst"].generation_for("fused_reasoning").llm_kwargs())
+    format_values = {
+            'context': state.get("image_caption", ""),
+            'question': state.get("question", ""),
+            'candidates': state.get("answer_candidate", ""),
+            'KBs_Knowledge': "\n".join(state.get("kbs_knowledge", [])),
+            'LMs_Knowledge': "\n".join(state.get("lms_knowledge", [])),
+            'Object_Analysis': "\n".join(state.get("object_analysis", []))
+    }
+
+    messages = render_prompt(template_name("fused_reasoning", state["analyst"].name),
+                             state["analyst"].fused_system_prompt, format_values)
+    response = invoke_llm(llm, messages, node="fused_reasoning", agent=state["analyst"].name)
+    
+    cleaned_content = remove_think_block(response.content)
+    rationale, answer = extract_rationale_and_answer(cleaned_content)
+    if not answer:
+        # No answer line (cut off or never written): ask for it on its own, as the unfused path does
+        answer = final_reasoning_node({**state, "rationales": [{state["analyst"].name: rationale}]})["results"][0][
+            state["analyst"].name]
+    print("agent: ", state["analyst"].name, "answer: ", answer)
+
+    # Same updates as rationale_node + final_reasoning_node
+    return {
+        "messages": [AIMessage(content=rationale)],
+        "rationales": [{state["analyst"].name: rationale}],
+        "results": [{state["analyst"].name: answer}]
+    }
+
+
 def should_continue(state: Union[ViReJuniorState, ViReSeniorState, ViReManagerState]) -> str:
     """Decide whether to continue with tools or move to final reasoning"""
     messages = state["messages"]
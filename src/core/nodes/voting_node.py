@@ -1,6 +1,15 @@
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Tuple, Optional
 from collections import Counter
 import re
+from src.utils.tracing import traced
+from src.utils.cancellation import cancellable
+
+# Voting weights according to paper
+AGENT_WEIGHTS = {
+    'junior': 2,
+    'senior': 3,
+    'manager': 4
+}
 
 def normalize_answer_for_voting(answer: str) -> str:
     """
@@ -51,12 +60,7 @@ def voting_function(junior_answer: str, senior_answer: str, manager_answer: str)
     Returns:
         Tuple of (final_answer, vote_breakdown)
     """
-    # Define weights according to paper
-    weights = {
-        'junior': 2,
-        'senior': 3,
-        'manager': 4
-    }
+    weights = AGENT_WEIGHTS
     
     # Count votes for each unique answer
     vote_counts = Counter()
@@ -78,6 +82,33 @@ def voting_function(junior_answer: str, senior_answer: str, manager_answer: str)
     # Fallback if no valid answers
     return "", {}
 
+def is_vote_decided(answers: Dict[str, str]) -> Optional[str]:
+    """
+    Winning answer if the weighted vote can no longer change, else None.
+    
+    Args:
+        answers: Normalized answers of the agents that finished, keyed by
+            agent name ("Junior", "Senior", "Manager")
+    
+    The leader is fixed once its votes exceed those of any other answer even
+    if every outstanding agent voted for that other answer.
+    """
+    vote_counts = Counter()
+    for agent, answer in answers.items():
+        if answer:
+            vote_counts[answer] += AGENT_WEIGHTS[agent.lower()]
+    if not vote_counts:
+        return None
+    
+    pending = sum(w for agent, w in AGENT_WEIGHTS.items()
+                  if agent not in {a.lower() for a in answers})
+    ranked = vote_counts.most_common()
+    leader, leader_votes = ranked[0]
+    runner_up_votes = ranked[1][1] if len(ranked) > 1 else 0
+    return leader if leader_votes > runner_up_votes + pending else None
+
+@cancellable
+@traced("node:voting")
 def voting_node(state) -> Dict[str, Any]:
     """
     Voting node that implements weighted voting mechanism from paper.
@@ -112,6 +143,8 @@ def voting_node(state) -> Dict[str, Any]:
     
     # Create detailed voting information
     voting_details = {
+        # Analysts cancelled by early consensus, if any
+        "skipped_agents": state.get("skipped_analysts", []),
         "agent_answers": {
             "junior": {"answer": junior_answer, "weight": 2},
             "senior": {"answer": senior_answer, "weight": 3},
@@ -0,0 +1,437 @@
+import atexit
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS thread_activity (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    Disk-backed LangGraph checkpointer with bounded storage.
+
+    - Write batching: checkpoints and pending writes are buffered and
+      committed in one transaction once `batch_size` statements are queued
+      or, by a background flusher, once the oldest one is `flush_interval`
+      seconds old. Reads flush first, and `close` (also run at exit)
+      flushes the rest.
+    - Retention: at most `max_checkpoints_per_thread` checkpoints are kept
+      per thread and namespace; older ones and their writes are deleted when
+      the batch is committed.
+    - TTL: threads not written for `ttl_seconds` are deleted by `compact`.
+    - Compaction: `compact` also drops channel blobs no kept checkpoint
+      references and VACUUMs the file, on its own connection. Commits wait
+      for the blob scan (one write transaction), not for VACUUM;
+      `start_compaction` runs it periodically in a daemon thread.
+
+    A process restarted on the same file resumes a thread from its last
+    committed checkpoint; completed tasks are not re-run because their
+    writes are stored. At most `flush_interval` seconds of writes are lost
+    on a crash, so `batch_size=1` gives write-through durability.
+
+    The graphs of this repo use no `DeltaChannel`, so keeping only the
+    latest checkpoints is safe for them.
+    """
+
+    def __init__(self, path: str, *, serde: Optional[SerializerProtocol] = None,
+                 batch_size: int = 32, flush_interval: float = 0.5,
+                 max_checkpoints_per_thread: Optional[int] = 10,
+                 ttl_seconds: Optional[float] = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.ttl_seconds = ttl_seconds
+
+        # Waits out the write lock a concurrent compaction holds
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=60.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+
+        self.pending: List[Tuple[str, tuple]] = []
+        self.pending_since: Optional[float] = None
+        self.touched: set = set()
+
+        self.stop_event = threading.Event()
+        self.compaction_thread: Optional[threading.Thread] = None
+        self.closed = False
+        atexit.register(self.close)
+        # Commits a thread's last writes even when no further write or read comes
+        self.flush_thread = threading.Thread(target=self._flush_loop, name="checkpoint-flush", daemon=True)
+        self.flush_thread.start()
+
+    # ---- Write batching ----
+
+    def _queue(self, statements: List[Tuple[str, tuple]], thread_id: str, checkpoint_ns: str):
+        with self.lock:
+            self.pending.extend(statements)
+            self.pending.append(("INSERT OR REPLACE INTO thread_activity (thread_id, updated_at) VALUES (?, ?)",
+                                 (thread_id, time.time())))
+            self.touched.add((thread_id, checkpoint_ns))
+            if self.pending_since is None:
+                self.pending_since = time.monotonic()
+            if (len(self.pending) >= self.batch_size
+                    or time.monotonic() - self.pending_since >= self.flush_interval):
+                self.flush()
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval / 2 or 0.05):
+            with self.lock:
+                if (not self.closed and self.pending_since is not None
+                        and time.monotonic() - self.pending_since >= self.flush_interval):
+                    try:
+                        self.flush()
+                    except Exception as e:
+                        print(f"Checkpoint flush failed: {e}")
+
+    @contextmanager
+    def _transaction(self, conn: Optional[sqlite3.Connection] = None, immediate: bool = False):
+        conn = conn or self.conn
+        # IMMEDIATE takes the write lock up front, so no commit lands between the reads
+        conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def flush(self):
+        """Commit the buffered statements in one transaction and apply retention"""
+        with self.lock:
+            if not self.pending:
+                return
+            statements, self.pending, self.pending_since = self.pending, [], None
+            touched, self.touched = self.touched, set()
+            with self._transaction():
+                for sql, params in statements:
+                    self.conn.execute(sql, params)
+                if self.max_checkpoints_per_thread:
+                    for thread_id, checkpoint_ns in touched:
+                        self._apply_retention(thread_id, checkpoint_ns, self.max_checkpoints_per_thread)
+
+    def _apply_retention(self, thread_id: str, checkpoint_ns: str, keep: int):
+        """Delete all but the `keep` latest checkpoints (and their writes) of a thread namespace"""
+        stale = [row[0] for row in self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?", (thread_id, checkpoint_ns, keep))]
+        for checkpoint_id in stale:
+            params = (thread_id, checkpoint_ns, checkpoint_id)
+            self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                              "AND checkpoint_id = ?", params)
+            self.conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                              "AND checkpoint_id = ?", params)
+
+    # ---- Reads ----
+
+    def _load_blobs(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?", (thread_id, checkpoint_ns, channel, str(version))).fetchone()
+            if row and row[0] != "empty":
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _load_writes(self, thread_id: str, checkpoint_ns: str, checkpoint_id: str) -> list:
+        rows = self.conn.execute(
+            "SELECT task_id, idx, channel, type, value, task_path FROM writes WHERE thread_id = ? "
+            "AND checkpoint_ns = ? AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        # Order in which a super-step applies its tasks' writes: (task_path, task_id, idx)
+        rows.sort(key=lambda r: (r[5], r[0], r[1]))
+        return [(task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, _, channel, type_, value, _ in rows]
+
+    def _to_tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata_type, metadata = row
+        checkpoint_: Checkpoint = self.serde.loads_typed((type_, checkpoint))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint_, "channel_values": self._load_blobs(
+                thread_id, checkpoint_ns, checkpoint_["channel_versions"])},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=({"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                             "checkpoint_id": parent_checkpoint_id}}
+                           if parent_checkpoint_id else None),
+            pending_writes=self._load_writes(thread_id, checkpoint_ns, checkpoint_id),
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = ("thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                   "type, checkpoint, metadata_type, metadata")
+        with self.lock:
+            self.flush()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = self.conn.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id, checkpoint_ns)).fetchone()
+            return self._to_tuple(row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        sql = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+               "metadata_type, metadata FROM checkpoints")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            self.flush()
+            rows = self.conn.execute(sql, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._to_tuple(row))
+        yield from results
+
+    # ---- Writes ----
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")
+
+        statements = []
+        for channel, version in new_versions.items():
+            type_, blob = self.serde.dumps_typed(values[channel]) if channel in values else ("empty", None)
+            statements.append((
+                "INSERT OR IGNORE INTO blobs (thread_id, checkpoint_ns, channel, version, type, blob) "
+                "VALUES (?, ?, ?, ?, ?, ?)", (thread_id, checkpoint_ns, channel, str(version), type_, blob)))
+        type_, serialized = self.serde.dumps_typed(c)
+        metadata_type, serialized_metadata = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        statements.append((
+            "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+            "type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+             type_, serialized, metadata_type, serialized_metadata)))
+        self._queue(statements, thread_id, checkpoint_ns)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # Special channels (errors, interrupts...) replace; regular writes are kept once
+        verb = "INSERT OR REPLACE" if all(channel in WRITES_IDX_MAP for channel, _ in writes) else "INSERT OR IGNORE"
+        statements = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            statements.append((
+                f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, "
+                "value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint_id, task_id, WRITES_IDX_MAP.get(channel, idx),
+                 channel, type_, blob, task_path)))
+        self._queue(statements, thread_id, checkpoint_ns)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock:
+            self.flush()
+            with self._transaction():
+                for table in ("checkpoints", "blobs", "writes", "thread_activity"):
+                    self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return
+        with self.lock:
+            self.flush()
+            with self._transaction():
+                for thread_id in thread_ids:
+                    namespaces = self.conn.execute(
+                        "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchall()
+                    for (checkpoint_ns,) in namespaces:
+                        self._apply_retention(thread_id, checkpoint_ns, 1)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same version format as the in-memory saver: sortable counter + random suffix
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---- Compaction ----
+
+    def compact(self, vacuum: bool = True) -> Dict[str, int]:
+        """Delete expired threads and unreferenced blobs, then reclaim the file space"""
+        with self.lock:
+            self.flush()
+        stats = {"expired_threads": 0, "orphan_blobs": 0}
+
+        # A separate connection, so graph writes only wait for the short delete transactions
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=60.0)
+        try:
+            if self.ttl_seconds:
+                cutoff = time.time() - self.ttl_seconds
+                expired = [row[0] for row in conn.execute(
+                    "SELECT thread_id FROM thread_activity WHERE updated_at < ?", (cutoff,))]
+                for thread_id in expired:
+                    with self._transaction(conn):
+                        # Skip threads written since the scan
+                        if conn.execute("DELETE FROM thread_activity WHERE thread_id = ? AND updated_at < ?",
+                                        (thread_id, cutoff)).rowcount:
+                            for table in ("checkpoints", "blobs", "writes"):
+                                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                            stats["expired_threads"] += 1
+
+            # Blobs are shared between checkpoints, so only the kept checkpoints' versions survive.
+            # Both scans and the delete run in one write transaction: a flush committing a new
+            # checkpoint and its blobs between the scans would otherwise lose those blobs.
+            with self._transaction(conn, immediate=True):
+                referenced = set()
+                for thread_id, checkpoint_ns, type_, checkpoint in conn.execute(
+                        "SELECT thread_id, checkpoint_ns, type, checkpoint FROM checkpoints"):
+                    versions = self.serde.loads_typed((type_, checkpoint))["channel_versions"]
+                    referenced.update((thread_id, checkpoint_ns, channel, str(version))
+                                      for channel, version in versions.items())
+                orphans = [row for row in conn.execute(
+                    "SELECT thread_id, checkpoint_ns, channel, version FROM blobs") if row not in referenced]
+                conn.executemany("DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                                 "AND channel = ? AND version = ?", orphans)
+            stats["orphan_blobs"] = len(orphans)
+            if vacuum:
+                conn.execute("VACUUM")
+        finally:
+            conn.close()
+        return stats
+
+    def start_compaction(self, interval: float = 3600.0, vacuum: bool = True):
+        """Run `compact` every `interval` seconds in a daemon thread"""
+        if self.compaction_thread is not None:
+            return
+
+        def loop():
+            while not self.stop_event.wait(interval):
+                try:
+                    self.compact(vacuum=vacuum)
+                except Exception as e:
+                    print(f"Checkpoint compaction failed: {e}")
+
+        self.compaction_thread = threading.Thread(target=loop, name="checkpoint-compaction", daemon=True)
+        self.compaction_thread.start()
+
+    def close(self):
+        """Flush the buffered writes and close the database"""
+        with self.lock:
+            if self.closed:
+                return
+            self.stop_event.set()
+            self.flush()
+            self.conn.close()
+            self.closed = True
+
+    # ---- Async variants (SQLite calls are short; run them inline) ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        return self.prune(thread_ids, strategy=strategy)
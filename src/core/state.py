@@ -4,18 +4,18 @@ from src.agents.strategies.junior_agent import JuniorAgent
 from src.agents.strategies.senior_agent import SeniorAgent
 from src.agents.strategies.manager_agent import ManagerAgent
 import operator
-from PIL import Image
-from typing import Union
 from typing import Optional
 class ViReAgentState(MessagesState):
     question: str
-    image: Union[str, Image.Image]
+    image: str  # image store handle, see src/utils/image_store.py
+    image_id: str
     image_caption: str
     
     #---- Results ----#
     results: Annotated[List[Dict[str, str]], operator.add]
     final_answer: str
     voting_details: Dict[str, Any]
+    skipped_analysts: List[str]
 
     #---- Explanation ----#
     explanation: str
@@ -23,7 +23,8 @@ class ViReAgentState(MessagesState):
 
 class ViReJuniorState(MessagesState):
     question: str
-    image: Union[str, Image.Image]
+    image: str  # image store handle, see src/utils/image_store.py
+    image_id: str
     analyst: JuniorAgent
     count_of_tool_calls: int
     image_caption: str
@@ -38,7 +39,8 @@ class ViReJuniorState(MessagesState):
 
 class ViReSeniorState(MessagesState):
     question: str
-    image: Union[str, Image.Image]
+    image: str  # image store handle, see src/utils/image_store.py
+    image_id: str
     analyst: SeniorAgent
     image_caption: str
     count_of_tool_calls: int
@@ -52,7 +54,8 @@ class ViReSeniorState(MessagesState):
 
 class ViReManagerState(MessagesState):
     question: str
-    image: Union[str, Image.Image]
+    image: str  # image store handle, see src/utils/image_store.py
+    image_id: str
     analyst: ManagerAgent
     image_caption: str
     count_of_tool_calls: int
@@ -46,14 +46,20 @@ class VQAXEvaluator:
     - BERTScore
     """
 
-    def __init__(self, device: str = "cuda"):
+    def __init__(self, device: str = "cuda", explanation_metrics: bool = True):
         """
         Initialize the evaluator with all necessary metric calculators.
 
         Args:
             device (str): Device to use for BERTScore computation
+            explanation_metrics (bool): Load the explanation scorers (COCO metrics
+                and BERTScore). Disable for answer-only evaluation.
         """
         self.device = device
+        self.scorers = {}
+        self.bert_scorer = None
+        if not explanation_metrics:
+            return
 
         # Initialize all scorers
         self.scorers = {
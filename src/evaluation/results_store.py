@@ -0,0 +1,85 @@
+"""
+Columnar (Parquet) storage for experiment results.
+
+A results file is split in two:
+- `<name>.parquet`: one row per sample (`detailed_results`)
+- `<name>.meta.json`: everything else (metrics, counts, timestamp, ...)
+
+Nested per-sample fields (rationales, gold explanations, ...) are stored as
+JSON strings; their column names are listed under `json_columns` in the
+metadata so `load_rows` can decode them again.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Columnar results need pyarrow. Install it with `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def columnar_paths(base_path: str) -> tuple[str, str]:
+    """(rows_path, meta_path) for a results base path without extension"""
+    return f"{base_path}.parquet", f"{base_path}.meta.json"
+
+
+def save_columnar(results: Dict[str, Any], base_path: str) -> tuple[str, str]:
+    """Write a final results dict as Parquet rows plus a JSON metadata file"""
+    pa = _require_pyarrow()
+    rows = results.get("detailed_results", [])
+
+    json_columns = sorted({
+        key for row in rows for key, value in row.items()
+        if isinstance(value, (list, dict))
+    })
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    encoded = {
+        key: [
+            json.dumps(row.get(key), ensure_ascii=False) if key in json_columns else row.get(key)
+            for row in rows
+        ]
+        for key in columns
+    }
+
+    rows_path, meta_path = columnar_paths(base_path)
+    pa.parquet.write_table(pa.table(encoded), rows_path, compression="zstd")
+
+    meta = {k: v for k, v in results.items() if k != "detailed_results"}
+    meta["json_columns"] = json_columns
+    meta["rows_file"] = os.path.basename(rows_path)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=4)
+
+    return rows_path, meta_path
+
+
+def load_meta(path: str) -> Dict[str, Any]:
+    """Load the metrics/metadata of a columnar results file (.parquet or .meta.json)"""
+    meta_path = path if path.endswith(".meta.json") else columnar_paths(path[:-len(".parquet")])[1]
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_rows(path: str, columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """Load per-sample rows, reading only `columns` when given"""
+    pa = _require_pyarrow()
+    table = pa.parquet.read_table(path, columns=list(columns) if columns else None)
+
+    meta_path = columnar_paths(path[:-len(".parquet")])[1]
+    json_columns = set()
+    if os.path.exists(meta_path):
+        json_columns = set(load_meta(meta_path).get("json_columns", []))
+
+    rows = table.to_pylist()
+    for row in rows:
+        for key in json_columns.intersection(row):
+            if row[key] is not None:
+                row[key] = json.loads(row[key])
+    return rows
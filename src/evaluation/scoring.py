@@ -0,0 +1,96 @@
+"""
+Scoring of saved or in-memory experiment results.
+
+Kept apart from the experiment runner so that re-scoring and shard merging
+only import the evaluation stack, not the graph, DAM tools or LLM clients.
+"""
+import json
+import logging
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from src.evaluation.results_store import load_rows
+from src.utils.text_processing import normalize_answer
+
+if TYPE_CHECKING:
+    from src.evaluation.metrics_x import VQAXEvaluator
+
+logger = logging.getLogger(__name__)
+
+
+def load_result_records(path: str) -> List[Dict]:
+    """
+    Load per-sample results from a saved results file.
+    
+    Accepts a final results JSON (`detailed_results`), a per-sample JSONL
+    results log or columnar Parquet rows. For logs, the last record of each
+    question_id wins.
+    """
+    if path.endswith(".parquet"):
+        return load_rows(path)
+    
+    if path.endswith(".jsonl"):
+        by_id = {}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt line in {path}")
+                    continue
+                by_id[record["question_id"]] = record
+        return list(by_id.values())
+    
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data["detailed_results"] if isinstance(data, dict) else data
+
+
+def compute_metrics(results: List[Dict], evaluator: "VQAXEvaluator", answers_only: bool = False) -> Dict[str, Any]:
+    """Compute answer and explanation metrics over the successful results"""
+    try:
+        # Extract successful results only
+        successful_results = [r for r in results if r["success"]]
+        
+        if not successful_results:
+            return {"error": "No successful samples to evaluate"}
+        
+        # Prepare answers
+        predicted_answers = [normalize_answer(r["final_answer"]) for r in successful_results]
+        ground_truth_answers = [normalize_answer(r["gold_answer"]) for r in successful_results]
+        
+        # Create vocabulary for answers
+        all_answers = sorted(list(set(predicted_answers + ground_truth_answers)))
+        answer_to_idx = {ans: i for i, ans in enumerate(all_answers)}
+        
+        predicted_answer_indices = [answer_to_idx[ans] for ans in predicted_answers]
+        ground_truth_answer_indices = [answer_to_idx[ans] for ans in ground_truth_answers]
+        
+        # Prepare explanations
+        predicted_explanations = {
+            str(r["question_id"]): [r["explanation"]] 
+            for r in successful_results
+        }
+        ground_truth_explanations = {
+            str(r["question_id"]): r["gold_explanation"] 
+            for r in successful_results
+        }
+        
+        # Compute metrics
+        answer_metrics = evaluator.compute_answer_metrics(
+            predicted_answer_indices, ground_truth_answer_indices
+        )
+        if answers_only:
+            return answer_metrics
+        
+        explanation_metrics = evaluator.compute_explanation_metrics(
+            predicted_explanations, ground_truth_explanations
+        )
+        
+        return {**answer_metrics, **explanation_metrics}
+        
+    except Exception as e:
+        logger.error(f"Error computing metrics: {e}")
+        return {"error": f"Failed to compute metrics: {e}"}
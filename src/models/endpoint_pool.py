@@ -0,0 +1,263 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import openai
+
+from src.utils.cancellation import SampleCancelled, remaining_time
+
+# Errors that say something about the endpoint rather than the request
+ENDPOINT_ERRORS = (
+    openai.APIConnectionError,      # includes APITimeoutError
+    openai.InternalServerError,
+    httpx.TransportError,
+)
+
+
+class Endpoint:
+    """One OpenAI-compatible inference server and its live counters"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.hedge_wins = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.time() >= self.ejected_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "failures": self.failures,
+            "outstanding": self.outstanding,
+            "healthy": self.healthy,
+            "hedge_wins": self.hedge_wins,
+        }
+
+
+class EndpointPool:
+    """
+    Routes LLM calls across several replicas of the same model.
+
+    Each call goes to the healthy endpoint with the fewest outstanding
+    requests. An endpoint is ejected for `eject_seconds` after `max_failures`
+    consecutive connection / server errors or a failed health probe, and is
+    re-admitted once a probe of its `/models` route succeeds. With
+    `hedge_after_ms` set, a call still running after that long (or failing
+    with a connection / server error) is duplicated on a second endpoint
+    and whichever response arrives first is used. Hedged calls run on a
+    pool of `max_workers` threads, which must cover every in-flight call
+    plus its duplicate so no request waits for a thread.
+    """
+
+    def __init__(self, urls: List[str], hedge_after_ms: Optional[float] = None, max_failures: int = 3,
+                 eject_seconds: float = 30.0, health_check_interval: float = 10.0,
+                 http_client: Optional[httpx.Client] = None, max_workers: int = 128):
+        if not urls:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = [Endpoint(url) for url in urls]
+        self.hedge_after = hedge_after_ms / 1000 if hedge_after_ms else None
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_check_interval = health_check_interval
+        self.http_client = http_client or httpx.Client(timeout=5.0)
+        self.lock = threading.Lock()
+        self.hedges = 0
+        # Runs both requests of hedged calls so the caller can wait on either
+        self.executor = (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-hedge")
+                         if self.hedge_after else None)
+
+        if health_check_interval > 0 and len(self.endpoints) > 1:
+            threading.Thread(target=self._health_loop, name="llm-health", daemon=True).start()
+
+    @property
+    def urls(self) -> List[str]:
+        return [endpoint.url for endpoint in self.endpoints]
+
+    # ---- Routing ---------------------------------------------------------
+
+    def acquire(self, exclude: Optional[Endpoint] = None) -> Optional[Endpoint]:
+        """Reserve the least loaded healthy endpoint (all endpoints if none is healthy)"""
+        with self.lock:
+            candidates = [e for e in self.endpoints if e is not exclude]
+            if not candidates:
+                return None
+            healthy = [e for e in candidates if e.healthy]
+            if healthy:
+                endpoint = min(healthy, key=lambda e: e.outstanding)
+            else:
+                # Everything is ejected: try the endpoint due back first
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, error: Optional[BaseException] = None):
+        with self.lock:
+            endpoint.outstanding -= 1
+            if error is None:
+                endpoint.consecutive_failures = 0
+            elif isinstance(error, ENDPOINT_ERRORS):
+                endpoint.failures += 1
+                endpoint.consecutive_failures += 1
+                if endpoint.consecutive_failures >= self.max_failures:
+                    self._eject(endpoint)
+
+    def _eject(self, endpoint: Endpoint):
+        endpoint.ejected_until = time.time() + self.eject_seconds
+        endpoint.consecutive_failures = 0
+
+    def _run(self, endpoint: Endpoint, request: Callable[[str], Any]):
+        try:
+            response = request(endpoint.url)
+        except BaseException as e:
+            self.release(endpoint, e)
+            raise
+        self.release(endpoint)
+        return response
+
+    def call(self, request: Callable[[str], Any]):
+        """
+        Run `request(url)` on the pool
+
+        Args:
+            request: Issues the call against the given endpoint URL
+
+        Returns:
+            The first successful response
+        """
+        endpoint = self.acquire()
+        if self.hedge_after is None or len(self.endpoints) < 2:
+            try:
+                return self._run(endpoint, request)
+            except ENDPOINT_ERRORS:
+                # One failover attempt on another replica
+                fallback = self.acquire(exclude=endpoint)
+                if fallback is None:
+                    raise
+                return self._run(fallback, request)
+        return self._hedged_call(endpoint, request)
+
+    def _hedged_call(self, endpoint: Endpoint, request: Callable[[str], Any]):
+        # Both requests keep the caller's tracing / cancellation context
+        def run(target: Endpoint, started: Optional[threading.Event]):
+            if started is not None:
+                started.set()
+            return self._run(target, request)
+
+        def submit(target: Endpoint, started: Optional[threading.Event] = None) -> Future:
+            future = self.executor.submit(contextvars.copy_context().run, run, target, started)
+            future.endpoint = target
+            return future
+
+        started = threading.Event()
+        primary = submit(endpoint, started)
+        # The hedge delay counts from when the request is sent, not from when it is queued
+        if not started.wait(timeout=remaining_time()):
+            raise SampleCancelled("sample deadline exceeded")
+        done, _ = wait([primary], timeout=self._wait_timeout(self.hedge_after))
+        if done and not isinstance(primary.exception(), ENDPOINT_ERRORS):
+            # Success, or a request error (e.g. 400) another replica would repeat
+            return primary.result()
+
+        # Slow primary, or one that hit an endpoint error: duplicate the request on another replica
+        secondary = self.acquire(exclude=endpoint)
+        if secondary is None:
+            return primary.result(timeout=remaining_time())
+        with self.lock:
+            self.hedges += 1
+        futures = [primary, submit(secondary)]
+
+        error: Optional[BaseException] = None
+        while futures:
+            done, _ = wait(futures, timeout=remaining_time(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise SampleCancelled("sample deadline exceeded")
+            for future in done:
+                futures.remove(future)
+                if future.exception() is None:
+                    # The slower request finishes in the background and only
+                    # releases its endpoint
+                    if future is not primary:
+                        with self.lock:
+                            future.endpoint.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    @staticmethod
+    def _wait_timeout(timeout: float) -> float:
+        remaining = remaining_time()
+        return timeout if remaining is None else min(timeout, remaining)
+
+    # ---- Health checks ---------------------------------------------------
+
+    def probe(self, endpoint: Endpoint) -> bool:
+        try:
+            return self.http_client.get(f"{endpoint.url}/models", timeout=5.0).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_check_interval)
+            for endpoint in self.endpoints:
+                ok = self.probe(endpoint)
+                with self.lock:
+                    if ok:
+                        endpoint.ejected_until = 0.0
+                    elif endpoint.healthy:
+                        self._eject(endpoint)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "hedges": self.hedges,
+                "endpoints": {e.url: e.stats() for e in self.endpoints},
+            }
+
+
+def load_endpoint_config(spec: str) -> Dict[str, Any]:
+    """
+    Parse an endpoint pool spec: a JSON file or a comma-separated URL list
+
+    The file holds either a list of URLs or an object with an `endpoints`
+    list and optional pool settings (`hedge_after_ms`, `max_failures`,
+    `eject_seconds`, `health_check_interval`).
+    """
+    if os.path.isfile(spec):
+        with open(spec, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        if isinstance(config, list):
+            config = {"endpoints": config}
+    else:
+        config = {"endpoints": [url.strip() for url in spec.split(",") if url.strip()]}
+    return config
+
+
+class PooledLLM:
+    """
+    Per-endpoint clients of one LLM configuration, called through an
+    EndpointPool. Exposes what `invoke_llm` and the batching dispatcher use
+    from a bound ChatOpenAI (`invoke`, `bound`, `kwargs`).
+    """
+
+    def __init__(self, pool: EndpointPool, clients: Dict[str, Any]):
+        self.pool = pool
+        self.clients = clients
+        first = next(iter(clients.values()))
+        self.bound = getattr(first, "bound", first)
+        self.kwargs = getattr(first, "kwargs", {})
+
+    def invoke(self, prompt: Any, config: Optional[Any] = None, **kwargs):
+        return self.pool.call(lambda url: self.clients[url].invoke(prompt, config, **kwargs))
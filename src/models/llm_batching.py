@@ -0,0 +1,156 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, List, NamedTuple, Optional
+
+from src.utils.cancellation import SampleCancelled, remaining_time
+from src.utils.prompt_utils import prefix_key
+
+
+class BatchingDispatcher:
+    """
+    Coalesces LLM calls issued by concurrent graph executions.
+
+    Calls are collected for up to `window_ms` (or until `max_batch_size` calls
+    are waiting), grouped by client and sent together, so the inference
+    server receives them in one burst and can schedule them in the same
+    batch. Each caller blocks until its own response is ready; its request
+    is sent with the time left before its sample deadline as the HTTP
+    timeout, so a caller that gives up does not leave its request running.
+
+    With `group_prefixes`, calls are ordered by prompt prefix and the first
+    call of a prefix not seen before is sent ahead of the others, so its KV
+    is in the server's prefix cache before the rest of the group is prefilled.
+
+    One long-lived thread collects and dispatches the bursts; the requests
+    themselves run on a pool of `max_workers` threads. Each call is still a
+    separate request, so the window only pays off when the server schedules
+    a burst better than the same calls spread over the window; it is off
+    unless LLM_BATCH_WINDOW_MS is set.
+    """
+
+    def __init__(self, window_ms: float = 10.0, max_batch_size: int = 32, group_prefixes: bool = False,
+                 max_workers: int = 64):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.group_prefixes = group_prefixes
+        self.warm_prefixes = set()
+        self.pending: "queue.Queue[Call]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.calls = 0
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-batch-call")
+        self.thread = threading.Thread(target=self._loop, name="llm-batching", daemon=True)
+        self.thread.start()
+
+    def invoke(self, llm, prompt: Any, config: Optional[Any] = None):
+        """Queue one call and wait for its response"""
+        timeout = remaining_time()
+        call = Call(llm, prompt, config, Future(), contextvars.copy_context(),
+                    time.time() + timeout if timeout is not None else None)
+        self.pending.put(call)
+        # The caller still honours the sample deadline while waiting
+        try:
+            return call.future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise SampleCancelled("sample deadline exceeded")
+
+    def _collect(self) -> List["Call"]:
+        batch = [self.pending.get()]
+        deadline = time.time() + self.window
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.pending.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            # Calls can only share a request burst when they use the same client
+            groups = {}
+            for call in batch:
+                groups.setdefault(id(call.llm), []).append(call)
+            for calls in groups.values():
+                self._submit(calls)
+
+    def _submit(self, calls: List["Call"]):
+        """Send one group without blocking the dispatch thread"""
+        with self.lock:
+            self.batches += 1
+            self.calls += len(calls)
+        if self.group_prefixes:
+            calls = sorted(calls, key=lambda call: prefix_key(call.prompt) or "")
+            leaders, seen = [], set()
+            for call in calls:
+                key = prefix_key(call.prompt)
+                if key is not None and key not in self.warm_prefixes and key not in seen:
+                    seen.add(key)
+                    leaders.append(call)
+            if leaders:
+                self.warm_prefixes.update(seen)
+                leader_ids = {id(call) for call in leaders}
+                followers = [call for call in calls if id(call) not in leader_ids]
+                # The rest of the group goes out once every leader has been answered
+                remaining = [len(leaders)]
+
+                def leader_done(_):
+                    with self.lock:
+                        remaining[0] -= 1
+                        last = remaining[0] == 0
+                    if last and followers:
+                        self._send(followers)
+
+                for call in leaders:
+                    call.future.add_done_callback(leader_done)
+                self._send(leaders)
+                return
+        self._send(calls)
+
+    def _send(self, calls: List["Call"]):
+        for call in calls:
+            self.executor.submit(call.context.run, self._run, call)
+
+    @staticmethod
+    def _run(call: "Call"):
+        if call.future.done():
+            return
+        kwargs = {}
+        if call.deadline is not None:
+            timeout = call.deadline - time.time()
+            if timeout <= 0:
+                call.future.set_exception(SampleCancelled("sample deadline exceeded"))
+                return
+            kwargs["timeout"] = timeout
+        try:
+            call.future.set_result(call.llm.invoke(call.prompt, call.config, **kwargs))
+        except BaseException as e:
+            # Always resolve the caller's future, even for KeyboardInterrupt / SystemExit
+            call.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+
+    def stats(self):
+        with self.lock:
+            return {
+                "batches": self.batches,
+                "calls": self.calls,
+                "mean_batch_size": self.calls / self.batches if self.batches else 0.0,
+            }
+
+
+class Call(NamedTuple):
+    """One queued LLM call"""
+    llm: Any
+    prompt: Any
+    config: Any
+    future: Future
+    # Caller's context (tracing, cancellation), and its absolute deadline if any
+    context: contextvars.Context
+    deadline: Optional[float]
@@ -1,31 +1,270 @@
 from langchain_openai import ChatOpenAI
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict
 from pydantic import SecretStr
 import os
+import threading
+import time
+import httpx
+from src.utils.tracing import tracer
+from src.utils.cancellation import check_cancelled, remaining_time
+from src.utils.prompt_utils import prompt_stats, template_name
+from src.utils.usage_tracking import record_cache_hit, record_llm_call
+from src.models.llm_cache import LLMResponseCache
+from src.models.llm_batching import BatchingDispatcher
+from src.models.endpoint_pool import EndpointPool, PooledLLM, load_endpoint_config
 
-def get_llm(with_tools: Optional[List[Any]] = None, temperature: float = 0):
+# Override per process (e.g. one LLM server per shard)
+LLM_BASE_URL = os.environ.get("LLM_BASE_URL", "http://127.0.0.1:1234/v1")
+LLM_MODEL = os.environ.get("LLM_MODEL", "Qwen/Qwen3-1.7B")
+# Size of the keep-alive connection pool shared by every client
+LLM_MAX_CONNECTIONS = 64
+# Opt-in response cache (LLM_CACHE_PATH) and its size limit
+LLM_CACHE_MAX_BYTES = 1 << 30
+# Optional replica pool (LLM_ENDPOINTS: JSON file or comma-separated URLs)
+# that replaces LLM_BASE_URL; LLM_HEDGE_AFTER_MS enables hedged requests
+
+_http_client: Optional[httpx.Client] = None
+_clients: Dict[tuple, Any] = {}
+_registry_lock = threading.Lock()
+_llm_cache: Optional[LLMResponseCache] = None
+_dispatcher: Optional[BatchingDispatcher] = None
+_endpoint_pool: Optional[EndpointPool] = None
+
+
+def _get_http_client() -> httpx.Client:
+    """Shared HTTP client, so every LLM client reuses the same keep-alive connections"""
+    global _http_client
+    if _http_client is None:
+        max_connections = int(os.environ.get("LLM_MAX_CONNECTIONS", LLM_MAX_CONNECTIONS))
+        _http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(None, connect=10.0),
+        )
+    return _http_client
+
+
+def configure_connection_pool(max_connections: int):
+    """Resize the shared connection pool (drops every cached client)"""
+    global _http_client
+    with _registry_lock:
+        os.environ["LLM_MAX_CONNECTIONS"] = str(max_connections)
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        _clients.clear()
+
+
+def configure_llm_cache(path: Optional[str], max_bytes: int = LLM_CACHE_MAX_BYTES):
+    """Enable the persistent response cache at `path` (None disables it)"""
+    global _llm_cache
+    with _registry_lock:
+        _llm_cache = LLMResponseCache(path, max_bytes) if path else None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """The response cache, created from LLM_CACHE_PATH on first use"""
+    global _llm_cache
+    if _llm_cache is None and os.environ.get("LLM_CACHE_PATH"):
+        max_bytes = int(os.environ.get("LLM_CACHE_MAX_BYTES", LLM_CACHE_MAX_BYTES))
+        configure_llm_cache(os.environ["LLM_CACHE_PATH"], max_bytes)
+    return _llm_cache
+
+
+def configure_batching(window_ms: float, max_batch_size: int = 32, group_prefixes: bool = False):
+    """Coalesce concurrent LLM calls for `window_ms` (0 disables batching)"""
+    global _dispatcher
+    with _registry_lock:
+        _dispatcher = _build_dispatcher(window_ms, max_batch_size, group_prefixes)
+
+
+def _build_dispatcher(window_ms: float, max_batch_size: int, group_prefixes: bool) -> Optional[BatchingDispatcher]:
+    if window_ms <= 0:
+        return None
+    # One request thread for every connection the HTTP client allows
+    max_connections = int(os.environ.get("LLM_MAX_CONNECTIONS", LLM_MAX_CONNECTIONS))
+    return BatchingDispatcher(window_ms, max_batch_size, group_prefixes, max_workers=max_connections)
+
+
+def get_dispatcher() -> Optional[BatchingDispatcher]:
+    """The batching dispatcher, created from LLM_BATCH_WINDOW_MS on first use"""
+    global _dispatcher
+    if _dispatcher is None and float(os.environ.get("LLM_BATCH_WINDOW_MS", 0)) > 0:
+        with _registry_lock:
+            # Concurrent first calls must not each start a dispatcher
+            if _dispatcher is None:
+                _dispatcher = _build_dispatcher(float(os.environ["LLM_BATCH_WINDOW_MS"]),
+                                                int(os.environ.get("LLM_MAX_BATCH_SIZE", 32)),
+                                                os.environ.get("LLM_PREFIX_GROUPING") == "1")
+    return _dispatcher
+
+
+def configure_endpoint_pool(urls: Optional[List[str]], **pool_kwargs):
+    """Route LLM calls across `urls` (None goes back to LLM_BASE_URL)"""
+    global _endpoint_pool
+    with _registry_lock:
+        _endpoint_pool = EndpointPool(urls, **pool_kwargs) if urls else None
+        _clients.clear()
+
+
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """The endpoint pool, created from LLM_ENDPOINTS on first use"""
+    global _endpoint_pool
+    if _endpoint_pool is None and os.environ.get("LLM_ENDPOINTS"):
+        with _registry_lock:
+            # Concurrent first calls must not each build a pool (and a health thread)
+            if _endpoint_pool is None:
+                config = load_endpoint_config(os.environ["LLM_ENDPOINTS"])
+                if os.environ.get("LLM_HEDGE_AFTER_MS"):
+                    config["hedge_after_ms"] = float(os.environ["LLM_HEDGE_AFTER_MS"])
+                # A primary and a duplicate for every connection the HTTP client allows
+                max_connections = int(os.environ.get("LLM_MAX_CONNECTIONS", LLM_MAX_CONNECTIONS))
+                config.setdefault("max_workers", 2 * max_connections)
+                _endpoint_pool = EndpointPool(config.pop("endpoints"), **config)
+                _clients.clear()
+    return _endpoint_pool
+
+
+def _get_client(base_url: str, model: str, temperature: float, seed: Optional[int], thinking: Optional[bool],
+                max_tokens: Optional[int], stop: Optional[List[str]], with_tools: Optional[List[Any]]):
+    tool_names = tuple(getattr(tool, "name", repr(tool)) for tool in with_tools or [])
+    key = (base_url, model, temperature, seed, thinking, max_tokens, tuple(stop or ()), tool_names)
+    
+    with _registry_lock:
+        llm = _clients.get(key)
+        if llm is not None:
+            return llm
+        
+        # Qwen3 chat template switch, understood by vLLM-style servers
+        extra_body = None
+        if thinking is not None:
+            extra_body = {"chat_template_kwargs": {"enable_thinking": thinking}}
+        
+        llm = ChatOpenAI(
+            base_url=base_url,
+            api_key="dummy",        
+            model=model,
+            temperature=temperature,
+            seed=seed,
+            max_tokens=max_tokens,
+            stop=stop,
+            extra_body=extra_body,
+            http_client=_get_http_client(),
+        )
+        
+        if with_tools:
+            llm = llm.bind_tools(with_tools)
+        
+        _clients[key] = llm
+    return llm
+
+
+def get_llm(with_tools: Optional[List[Any]] = None, temperature: float = 0, seed: Optional[int] = None,
+            thinking: Optional[bool] = None, max_tokens: Optional[int] = None, stop: Optional[List[str]] = None):
     """
-    Factory function to create ChatOpenAI instance with consistent configuration
+    Factory function returning a ChatOpenAI instance with consistent configuration
+    
+    Clients are memoized by (endpoint, model, generation settings, tool set) and share
+    one keep-alive connection pool, so repeated calls do not rebuild clients or
+    reconnect. When an endpoint pool is configured, the returned LLM routes
+    each call to one of the pool's replicas.
     
     Args:
         with_tools: List of tools to bind to the LLM
         temperature: Temperature setting for the LLM
+        seed: Sampling seed; defaults to LLM_SEED when set
+        thinking: Enable / disable Qwen3 thinking mode (None = server default)
+        max_tokens: Cap on generated tokens
+        stop: Stop sequences
         
     Returns:
-        ChatOpenAI instance, optionally bound with tools
+        ChatOpenAI instance (or PooledLLM), optionally bound with tools
     """
-    llm = ChatOpenAI(
-        base_url="http://127.0.0.1:1234/v1",   
-        api_key="dummy",        
-        model="Qwen/Qwen3-1.7B",      
-        temperature=temperature,
-    )
+    base_url = os.environ.get("LLM_BASE_URL", LLM_BASE_URL)
+    model = os.environ.get("LLM_MODEL", LLM_MODEL)
+    if seed is None and os.environ.get("LLM_SEED"):
+        seed = int(os.environ["LLM_SEED"])
+    settings = (temperature, seed, thinking, max_tokens, stop, with_tools)
     
-    if with_tools:
-        llm = llm.bind_tools(with_tools)
+    pool = get_endpoint_pool()
+    if pool is None:
+        return _get_client(base_url, model, *settings)
     
+    # Memoized as well: the batching dispatcher groups calls by client identity
+    tool_names = tuple(getattr(tool, "name", repr(tool)) for tool in with_tools or [])
+    key = (tuple(pool.urls), model, temperature, seed, thinking, max_tokens, tuple(stop or ()), tool_names)
+    llm = _clients.get(key)
+    if llm is None:
+        llm = PooledLLM(pool, {url: _get_client(url, model, *settings) for url in pool.urls})
+        with _registry_lock:
+            llm = _clients.setdefault(key, llm)
     return llm
 
 
+def _cache_key(llm, prompt: Any) -> Optional[str]:
+    """Cache key of a call, or None when the call is not reproducible"""
+    chat = getattr(llm, "bound", llm)
+    # Sampled completions are only cacheable with a pinned seed
+    if chat.temperature and chat.seed is None:
+        return None
+    params = {
+        "temperature": chat.temperature,
+        "seed": chat.seed,
+        "max_tokens": chat.max_tokens,
+        "stop": chat.stop,
+        "extra_body": chat.extra_body,
+    }
+    tools = getattr(llm, "kwargs", {}).get("tools")
+    return LLMResponseCache.make_key(chat.model_name, params, tools, prompt)
+
+
+def invoke_llm(llm, prompt: Any, config: Optional[Any] = None, *, node: str, agent: Optional[str] = None):
+    """
+    Invoke an LLM inside a traced span, through the response cache and the
+    batching dispatcher when they are enabled
+    
+    Args:
+        llm: LLM returned by `get_llm`
+        prompt: Prompt string or list of messages
+        config: Optional RunnableConfig forwarded to the LLM
+        node: Name of the pipeline node issuing the call
+        agent: Name of the agent issuing the call, if any
+        
+    Returns:
+        The LLM response message
+    """
+    check_cancelled()
+    tags = {"node": node}
+    if agent:
+        tags["agent"] = agent
+    
+    cache = get_llm_cache()
+    key = _cache_key(llm, prompt) if cache is not None else None
+    if key is not None:
+        cached = cache.lookup(key)
+        if cached is not None:
+            record_cache_hit(node, agent)
+            return cached
+    
+    dispatcher = get_dispatcher()
+    start = time.time()
+    with tracer.span(f"llm:{node}", **tags):
+        if dispatcher is not None:
+            response = dispatcher.invoke(llm, prompt, config)
+        else:
+            # Never wait on the server past the sample deadline
+            timeout = remaining_time()
+            kwargs = {"timeout": timeout} if timeout is not None else {}
+            response = llm.invoke(prompt, config, **kwargs)
+    record_llm_call(node, agent, prompt, response, time.time() - start)
+    prompt_stats.record(template_name(node, agent), response)
+    
+    if key is not None:
+        cache.update(key, response)
+    return response
+
+
 # "http://127.0.0.1:1234/v1"
 # "https://api.groq.com/openai/v1"
\ No newline at end of file
@@ -1,36 +1,71 @@
-import torch
+import hashlib
+import os
+import threading
+from types import SimpleNamespace
 from PIL import Image
 from src.utils.image_processing import load_image
-from transformers import AutoModel, AutoProcessor
-from transformers import AutoModelForZeroShotObjectDetection, AutoProcessor as DinoProcessor
-from transformers import SamModel, AutoProcessor as SamProcessor
-import numpy as np
-
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-
-# DAM (Describe Anything Model)
-model = AutoModel.from_pretrained(
-    'nvidia/DAM-3B-Self-Contained',
-    trust_remote_code=True,
-    torch_dtype='torch.float16'
-).to(device)
-dam = model.init_dam(conv_mode='v1', prompt_mode='full+focal_crop')
-
-# Grounding DINO
-gd_model_id = "IDEA-Research/grounding-dino-tiny"
-gd_processor = DinoProcessor.from_pretrained(gd_model_id)
-gd_model = AutoModelForZeroShotObjectDetection.from_pretrained(gd_model_id).to(device)
-print("Grounding DINO model loaded.")
-
-# SAM (Segment Anything Model)
-sam_model_id = "facebook/sam-vit-base"
-sam_processor = SamProcessor.from_pretrained(sam_model_id)
-sam_model = SamModel.from_pretrained(sam_model_id).to(device)
-print("SAM model loaded.")
 
+# DAM_TOOLS_STUB=1 answers with deterministic text instead of loading DAM-3B,
+# Grounding DINO and SAM (offline runs against api/stub_server.py)
+DAM_TOOLS_STUB = os.environ.get("DAM_TOOLS_STUB") == "1"
+
+_models = None
+_models_lock = threading.Lock()
+# The models are shared by every sample and tool-call thread; one inference runs at a time
+_inference_lock = threading.Lock()
+
+
+def _load_models() -> SimpleNamespace:
+    """DAM, Grounding DINO and SAM, loaded on first use"""
+    global _models
+    with _models_lock:
+        if _models is not None:
+            return _models
+        import torch
+        from transformers import AutoModel
+        from transformers import AutoModelForZeroShotObjectDetection, AutoProcessor as DinoProcessor
+        from transformers import SamModel, AutoProcessor as SamProcessor
+
+        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+        # DAM (Describe Anything Model)
+        model = AutoModel.from_pretrained(
+            'nvidia/DAM-3B-Self-Contained',
+            trust_remote_code=True,
+            torch_dtype='torch.float16'
+        ).to(device)
+        dam = model.init_dam(conv_mode='v1', prompt_mode='full+focal_crop')
+
+        # Grounding DINO
+        gd_model_id = "IDEA-Research/grounding-dino-tiny"
+        gd_processor = DinoProcessor.from_pretrained(gd_model_id)
+        gd_model = AutoModelForZeroShotObjectDetection.from_pretrained(gd_model_id).to(device)
+        print("Grounding DINO model loaded.")
+
+        # SAM (Segment Anything Model)
+        sam_model_id = "facebook/sam-vit-base"
+        sam_processor = SamProcessor.from_pretrained(sam_model_id)
+        sam_model = SamModel.from_pretrained(sam_model_id).to(device)
+        print("SAM model loaded.")
+
+        _models = SimpleNamespace(torch=torch, device=device, dam=dam,
+                                  gd_processor=gd_processor, gd_model=gd_model,
+                                  sam_processor=sam_processor, sam_model=sam_model)
+        return _models
+
+
+def _stub_description(*parts: str) -> str:
+    """Deterministic stand-in for a DAM description"""
+    colors = ("đỏ", "xanh", "trắng", "đen", "vàng")
+    digest = int(hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:8], 16)
+    return colors[digest % len(colors)]
 
 
 def dam_candidate_answers(image: str, question: str) -> str:
+    if DAM_TOOLS_STUB:
+        first = _stub_description(question)
+        return f"Candidates: {first}(0.82), có(0.41), không(0.33), hai(0.12), unanswerable(0.05)"
+    models = _load_models()
     img = load_image(image)
     full_mask = Image.new("L", img.size, 255)
     prompt = f"""<image>
@@ -52,8 +87,8 @@ def dam_candidate_answers(image: str, question: str) -> str:
     Question: {question}  
     Answer:
     """
-    with torch.no_grad():
-        result = dam.get_description(
+    with _inference_lock, models.torch.no_grad():
+        result = models.dam.get_description(
             img,
             full_mask,
             prompt,
@@ -66,6 +101,9 @@ def dam_candidate_answers(image: str, question: str) -> str:
     return result
 
 def dam_caption_image(image: str) -> str:
+    if DAM_TOOLS_STUB:
+        return f"A {_stub_description(image)} object in the middle of an everyday scene."
+    models = _load_models()
     img = load_image(image)
     full_mask = Image.new("L", img.size, 255)
     prompt = """<image>
@@ -84,8 +122,8 @@ def dam_caption_image(image: str) -> str:
     Now apply to the new image:
 
     Caption:"""
-    with torch.no_grad():
-        result = dam.get_description(
+    with _inference_lock, models.torch.no_grad():
+        result = models.dam.get_description(
             img,
             full_mask,
             prompt,
@@ -98,14 +136,17 @@ def dam_caption_image(image: str) -> str:
     return result
 
 def dam_extract_knowledge(image: str) -> str:
+    if DAM_TOOLS_STUB:
+        return "The scene shows common objects in a typical indoor or street setting."
+    models = _load_models()
     img = load_image(image)
     full_mask = Image.new("L", img.size, 255)
     prompt = f"""
         <image>
         Provide a highly detailed description of the image.
         """.strip()
-    with torch.no_grad():
-        result = dam.get_description(
+    with _inference_lock, models.torch.no_grad():
+        result = models.dam.get_description(
             img,
             full_mask,
             prompt,
@@ -120,11 +161,12 @@ def dam_extract_knowledge(image: str) -> str:
 
 def get_bbox_from_prompt(image: Image.Image, text_prompt: str) -> list | None:
     """Sử dụng Grounding DINO để lấy bbox từ prompt."""
-    inputs = gd_processor(images=image, text=[[text_prompt]], return_tensors="pt").to(device)
-    with torch.no_grad():
-        outputs = gd_model(**inputs)
+    models = _load_models()
+    inputs = models.gd_processor(images=image, text=[[text_prompt]], return_tensors="pt").to(models.device)
+    with _inference_lock, models.torch.no_grad():
+        outputs = models.gd_model(**inputs)
     
-    results = gd_processor.post_process_grounded_object_detection(
+    results = models.gd_processor.post_process_grounded_object_detection(
         outputs, inputs.input_ids, box_threshold=0.35, target_sizes=[image.size[::-1]]
     )
     
@@ -132,17 +174,18 @@ def get_bbox_from_prompt(image: Image.Image, text_prompt: str) -> list | None:
     if len(result["scores"]) == 0:
         return None
     
-    best_idx = torch.argmax(result["scores"])
+    best_idx = models.torch.argmax(result["scores"])
     return result["boxes"][best_idx].tolist()
 
 
-def get_mask_from_bbox(image: Image.Image, bbox: list) -> np.ndarray:
+def get_mask_from_bbox(image: Image.Image, bbox: list) -> "numpy.ndarray":
     """Sử dụng SAM để lấy mask từ bbox."""
-    inputs = sam_processor(image, input_boxes=[[bbox]], return_tensors="pt").to(device)
-    with torch.no_grad():
-        outputs = sam_model(**inputs)
+    models = _load_models()
+    inputs = models.sam_processor(image, input_boxes=[[bbox]], return_tensors="pt").to(models.device)
+    with _inference_lock, models.torch.no_grad():
+        outputs = models.sam_model(**inputs)
     
-    masks = sam_processor.image_processor.post_process_masks(
+    masks = models.sam_processor.image_processor.post_process_masks(
         outputs.pred_masks.cpu(), inputs["original_sizes"].cpu(), inputs["reshaped_input_sizes"].cpu()
     )[0][0]
     
@@ -151,6 +194,12 @@ def get_mask_from_bbox(image: Image.Image, bbox: list) -> np.ndarray:
     return masks[best_mask_idx].numpy()
 
 def describe_object_with_prompt(image: str, object_name: str) -> str:
+    if DAM_TOOLS_STUB:
+        return (f"- **Object Identity:** {object_name}\n"
+                f"- **Visual Description:** {_stub_description(image, object_name)}\n"
+                "- **Image Context:** in the foreground of the photo\n"
+                "- **General Knowledge:** a common everyday object")
+    models = _load_models()
     try:
         img = load_image(image)
     except Exception as e:
@@ -163,7 +212,7 @@ def describe_object_with_prompt(image: str, object_name: str) -> str:
 
     # Bước 2: Phân đoạn đối tượng bằng SAM
     mask_np = get_mask_from_bbox(img, bbox)
-    mask = Image.fromarray((mask_np * 255).astype(np.uint8))
+    mask = Image.fromarray((mask_np * 255).astype("uint8"))
 
     # Bước 3: Mô tả đối tượng bằng DAM
     dam_prompt = (
@@ -176,8 +225,8 @@ def describe_object_with_prompt(image: str, object_name: str) -> str:
         "- **General Knowledge:** [An interesting fact, common use, or relevant information about this object]"
     )
     
-    with torch.no_grad():
-        result = dam.get_description(
+    with _inference_lock, models.torch.no_grad():
+        result = models.dam.get_description(
             img,
             mask,
             dam_prompt,
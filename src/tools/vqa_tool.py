@@ -1,10 +1,14 @@
+import os
 from PIL import Image
 import requests
 from langchain_core.tools import tool
 from typing import Union
+from src.utils.cancellation import remaining_time
+from src.utils.image_processing import image_to_base64
 from src.tools.dam_tools import dam_candidate_answers, dam_caption_image, dam_extract_knowledge, describe_object_with_prompt
 
-VQA_API_URL = "http://localhost:1235/vqa/predict_base64"
+# Override per process (e.g. one VQA API per shard)
+VQA_API_URL = os.environ.get("VQA_API_URL", "http://localhost:1235/vqa/predict_base64")
 
 
 @tool
@@ -12,12 +16,14 @@ def vqa_tool(image: str, question: str) -> str:
     """return the candidate answer with probability of the question"""
     try:
         payload = {
-            "image_base64": image,
+            # Store handles are resolved to the payload encoded once per image
+            "image_base64": image_to_base64(image),
             "question": question,
             "top_k": 5
         }
         
-        response = requests.post(VQA_API_URL, data=payload, timeout=30)
+        api_url = os.environ.get("VQA_API_URL", VQA_API_URL)
+        response = requests.post(api_url, data=payload, timeout=remaining_time(30))
         
         response.raise_for_status()
         
@@ -0,0 +1,61 @@
+import threading
+from typing import Any, Callable, Dict
+
+
+class ImageArtifactCache:
+    """
+    Per-image cache for artifacts shared by every question on the same image
+    (decoded image, caption, object analyses).
+
+    Entries are reference counted: the runner retains an image once per
+    scheduled question and each finished question releases it, so the
+    artifacts of an image are dropped right after its last question.
+    """
+
+    def __init__(self):
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        self.refcounts: Dict[str, int] = {}
+        self.key_locks: Dict[tuple, threading.Lock] = {}
+        self.lock = threading.Lock()
+
+    def retain(self, image_id: str, count: int = 1):
+        """Register `count` upcoming users of `image_id`"""
+        with self.lock:
+            self.refcounts[image_id] = self.refcounts.get(image_id, 0) + count
+
+    def release(self, image_id: str):
+        """Drop one user of `image_id`; artifacts are freed with the last one"""
+        with self.lock:
+            remaining = self.refcounts.get(image_id, 0) - 1
+            if remaining > 0:
+                self.refcounts[image_id] = remaining
+                return
+            self.refcounts.pop(image_id, None)
+            # The decoded image may still be shared through the image store, so it
+            # is not closed here; it is freed with its last reference
+            self.artifacts.pop(image_id, None)
+            for key in [k for k in self.key_locks if k[0] == image_id]:
+                del self.key_locks[key]
+
+    def get_or_compute(self, image_id: str, name: str, compute: Callable[[], Any]) -> Any:
+        """Return the cached artifact, computing it at most once per image"""
+        with self.lock:
+            cached = self.artifacts.get(image_id, {})
+            if name in cached:
+                return cached[name]
+            key_lock = self.key_locks.setdefault((image_id, name), threading.Lock())
+
+        # Concurrent questions on the same image wait for the first computation
+        with key_lock:
+            with self.lock:
+                cached = self.artifacts.get(image_id, {})
+                if name in cached:
+                    return cached[name]
+            value = compute()
+            with self.lock:
+                self.artifacts.setdefault(image_id, {})[name] = value
+            return value
+
+
+# Global artifact cache instance
+artifact_cache = ImageArtifactCache()
@@ -0,0 +1,97 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Optional
+
+
+class SampleCancelled(Exception):
+    """Raised inside pipeline work once its sample was cancelled or timed out"""
+
+
+class CancelToken:
+    """Cancellation flag with an optional absolute deadline (time.time())"""
+
+    def __init__(self, deadline: Optional[float] = None, parent: Optional["CancelToken"] = None):
+        self.deadline = deadline
+        self.parent = parent
+        self.event = threading.Event()
+        self.reason = "cancelled"
+
+    def cancel(self, reason: str = "cancelled"):
+        self.reason = reason
+        self.event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self.event.is_set():
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel("deadline exceeded")
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        return False
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the closest deadline, None if unbounded"""
+        deadlines = []
+        token = self
+        while token is not None:
+            if token.deadline is not None:
+                deadlines.append(token.deadline)
+            token = token.parent
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.time())
+
+    def check(self):
+        if self.cancelled:
+            raise SampleCancelled(self.reason)
+
+
+# Token of the sample currently being processed by this thread / task
+_current_token = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make `token` the current token for the enclosed work"""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    return _current_token.get()
+
+
+def check_cancelled():
+    """Raise SampleCancelled if the current sample was cancelled"""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def remaining_time(default: Optional[float] = None) -> Optional[float]:
+    """Timeout for a blocking call: `default`, capped by the current deadline"""
+    token = _current_token.get()
+    remaining = token.remaining() if token is not None else None
+    if remaining is None:
+        return default
+    if default is None:
+        return remaining
+    return min(default, remaining)
+
+
+def cancellable(func):
+    """Decorator that checks for cancellation before running a graph node"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        check_cancelled()
+        return func(*args, **kwargs)
+    return wrapper
@@ -3,15 +3,26 @@ from io import BytesIO
 from PIL import Image
 from typing import Union
 import requests
+from src.utils.image_store import image_store
 
 def pil_to_base64(img: Image.Image) -> str:
     buf = BytesIO()
     img.save(buf, format="JPEG")
     return base64.b64encode(buf.getvalue()).decode("utf-8")
 
+def image_to_base64(image: Union[str, Image.Image]) -> str:
+    """Base64 JPEG payload of an image store handle (encoded once per image), a PIL image or a payload"""
+    if image_store.is_handle(image):
+        return image_store.get_encoded(image, "base64_jpeg", pil_to_base64)
+    if isinstance(image, Image.Image):
+        return pil_to_base64(image)
+    return image
+
 def load_image(image: Union[str, Image.Image]) -> Image.Image:
     if isinstance(image, str):
-        if image.startswith('http'):
+        if image_store.is_handle(image):
+            img = image_store.get(image)
+        elif image.startswith('http'):
             resp = requests.get(image)
             resp.raise_for_status()
             img = Image.open(BytesIO(resp.content)).convert('RGB')
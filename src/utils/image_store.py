@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict
+
+from PIL import Image
+
+# Handles are short strings, so they never collide with URLs or base64 payloads
+HANDLE_PREFIX = "img:"
+
+
+class ImageStore:
+    """
+    Content-addressed store of the images of the requests in flight.
+
+    Graph state carries only the handle returned by `put`; tools resolve it
+    to the decoded image or to an encoded form (computed once per image) on
+    demand, so no node, subgraph copy or checkpoint holds the pixels.
+
+    Entries are reference counted: every `put` is paired with a `release`,
+    and an image is dropped when its last request is done. Identical images
+    share one entry whatever file they came from.
+    """
+
+    def __init__(self):
+        self.images: Dict[str, Image.Image] = {}
+        self.encoded: Dict[str, Dict[str, Any]] = {}
+        self.refcounts: Dict[str, int] = {}
+        self.key_locks: Dict[tuple, threading.Lock] = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def is_handle(value: Any) -> bool:
+        return isinstance(value, str) and value.startswith(HANDLE_PREFIX)
+
+    @staticmethod
+    def content_id(image: Image.Image) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}:{image.size}".encode("utf-8"))
+        digest.update(image.tobytes())
+        return HANDLE_PREFIX + digest.hexdigest()[:32]
+
+    def put(self, image: Image.Image) -> str:
+        """Store `image` for one request and return its handle"""
+        handle = self.content_id(image)
+        with self.lock:
+            self.images.setdefault(handle, image)
+            self.refcounts[handle] = self.refcounts.get(handle, 0) + 1
+        return handle
+
+    def release(self, handle: str):
+        """Drop one request's reference; the image and its encodings go with the last one"""
+        with self.lock:
+            remaining = self.refcounts.get(handle, 0) - 1
+            if remaining > 0:
+                self.refcounts[handle] = remaining
+                return
+            self.refcounts.pop(handle, None)
+            self.images.pop(handle, None)
+            self.encoded.pop(handle, None)
+            for key in [k for k in self.key_locks if k[0] == handle]:
+                del self.key_locks[key]
+
+    def get(self, handle: str) -> Image.Image:
+        """Decoded image of `handle`"""
+        with self.lock:
+            image = self.images.get(handle)
+        if image is None:
+            raise KeyError(f"Unknown or released image handle: {handle}")
+        return image
+
+    def get_encoded(self, handle: str, name: str, encode: Callable[[Image.Image], Any]) -> Any:
+        """Encoded form `name` of the image, computed at most once per image"""
+        with self.lock:
+            cached = self.encoded.get(handle, {})
+            if name in cached:
+                return cached[name]
+            key_lock = self.key_locks.setdefault((handle, name), threading.Lock())
+
+        # Concurrent tool calls on the same image wait for the first encoding
+        with key_lock:
+            with self.lock:
+                cached = self.encoded.get(handle, {})
+                if name in cached:
+                    return cached[name]
+            value = encode(self.get(handle))
+            with self.lock:
+                if handle in self.images:
+                    self.encoded.setdefault(handle, {})[name] = value
+            return value
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"images": len(self.images), "encoded": sum(len(v) for v in self.encoded.values())}
+
+
+# Global image store instance
+image_store = ImageStore()
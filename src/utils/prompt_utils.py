@@ -0,0 +1,125 @@
+import hashlib
+import os
+import re
+import textwrap
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+
+
+class PromptTemplate:
+    """
+    Prompt split into a static prefix and a per-request suffix.
+
+    Everything before the line holding the first placeholder is sent
+    verbatim as the system message, so every call of the template starts
+    with the same bytes and the inference server's prefix cache can reuse
+    the KV of the instructions and few-shot examples. The rest is formatted
+    per request and sent as the user message, so templates keep their
+    instructions above the first placeholder and only the per-request fields
+    below it.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        match = _PLACEHOLDER.search(template)
+        split = template.rfind("\n", 0, match.start()) + 1 if match else len(template)
+        self.prefix = textwrap.dedent(template[:split]).strip()
+        self.suffix = textwrap.dedent(template[split:]).strip()
+        self.placeholders = _PLACEHOLDER.findall(self.suffix)
+        self.prefix_id = hashlib.sha1(self.prefix.encode("utf-8")).hexdigest()[:12]
+        prompt_stats.register(self)
+
+    def render(self, values: Dict[str, Any]) -> List[BaseMessage]:
+        """Messages for one request; placeholders missing from `values` are rendered empty"""
+        dynamic = self.suffix.format(**{key: values.get(key, "") for key in self.placeholders})
+        return [SystemMessage(content=self.prefix), HumanMessage(content=dynamic)]
+
+
+@lru_cache(maxsize=None)
+def get_template(name: str, template: str) -> PromptTemplate:
+    """Template compiled once per (name, text)"""
+    return PromptTemplate(name, template)
+
+
+def render_prompt(name: str, template: str, values: Dict[str, Any]) -> List[BaseMessage]:
+    return get_template(name, template).render(values)
+
+
+def template_name(node: str, agent: Optional[str] = None) -> str:
+    """Name under which a node's prompt template is registered"""
+    return f"{agent}:{node}" if agent else node
+
+
+def prefix_key(prompt: Any) -> Optional[str]:
+    """Id of the static prefix of a rendered prompt (None for plain strings)"""
+    if isinstance(prompt, list) and prompt and isinstance(prompt[0], SystemMessage):
+        return hashlib.sha1(prompt[0].content.encode("utf-8")).hexdigest()[:12]
+    return None
+
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def count_tokens(text: str) -> Optional[int]:
+    """Token count with the served model's tokenizer, None when it is not available locally"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+                from src.models.llm_provider import LLM_MODEL
+                _tokenizer = AutoTokenizer.from_pretrained(os.environ.get("LLM_MODEL", LLM_MODEL),
+                                                           local_files_only=True)
+            except Exception:
+                _tokenizer = False
+    if not _tokenizer:
+        return None
+    return len(_tokenizer.encode(text, add_special_tokens=False))
+
+
+class PromptPrefixStats:
+    """Static prefix size per template and the prompt tokens the server served from its cache"""
+
+    def __init__(self):
+        self.templates: Dict[str, PromptTemplate] = {}
+        self.usage = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        self.lock = threading.Lock()
+
+    def register(self, template: PromptTemplate):
+        with self.lock:
+            self.templates[template.name] = template
+
+    def record(self, name: str, response: Any):
+        """Accumulate the usage reported with an LLM response"""
+        usage = getattr(response, "usage_metadata", None) or {}
+        with self.lock:
+            entry = self.usage[name]
+            entry["calls"] += 1
+            entry["prompt_tokens"] += usage.get("input_tokens", 0)
+            entry["cached_tokens"] += (usage.get("input_token_details") or {}).get("cache_read", 0)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self.lock:
+            templates = dict(self.templates)
+            usage = {name: dict(entry) for name, entry in self.usage.items()}
+        report = {}
+        for name, template in sorted(templates.items()):
+            entry = usage.get(name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            report[name] = {
+                "prefix_id": template.prefix_id,
+                "prefix_chars": len(template.prefix),
+                "prefix_tokens": count_tokens(template.prefix),
+                **entry,
+            }
+        return report
+
+
+# Global prompt prefix statistics
+prompt_stats = PromptPrefixStats()
@@ -67,6 +67,21 @@ def extract_rationale(result: str) -> str:
     # Nếu không, trả về toàn bộ chuỗi
     return result.strip()
 
+def extract_rationale_and_answer(result: str) -> Tuple[str, str]:
+    """
+    Tách (rationale, answer) từ một lần sinh có dạng "Rationale: ...\nAnswer: ...".
+    Phần trước marker "Answer:" là rationale; câu trả lời chỉ lấy dòng đầu tiên
+    sau marker (phần mô hình viết tiếp, ví dụ một example mới, bị bỏ).
+    Không có marker "Answer:" thì answer rỗng, để nơi gọi hỏi lại câu trả lời.
+    """
+    if not result:
+        return "", ""
+    parts = re.split(r'Answer:', result, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) < 2:
+        return extract_rationale(parts[0]), ""
+    answer_lines = parts[1].strip().splitlines()
+    return extract_rationale(parts[0]), answer_lines[0].strip() if answer_lines else ""
+
 def extract_explanation(result: str) -> str:
     """
     Extract the explanation from the agent's result text,
@@ -127,3 +142,21 @@ def normalize_answer(text: str) -> str:
     text = " ".join(words)
     
     return text
+
+
+# Question words and function words that make poor search queries
+QUESTION_STOPWORDS = {
+    "cái", "gì", "nào", "là", "có", "không", "của", "trong", "trên", "dưới", "này", "kia", "đó",
+    "đang", "được", "những", "các", "một", "ở", "đâu", "bao", "nhiêu", "mấy", "ai", "sao", "tại",
+    "và", "với", "thì", "mà", "bị", "cho", "như", "thế", "hay", "hoặc", "phải", "đây",
+    "what", "which", "who", "where", "when", "how", "is", "are", "the", "a", "an", "of", "in", "on",
+}
+
+def extract_keywords(question: str, max_words: int = 6) -> str:
+    """
+    Rút các từ khóa của câu hỏi để tra cứu (ví dụ Wikipedia).
+    - Bỏ dấu câu, từ để hỏi và hư từ; giữ thứ tự xuất hiện
+    """
+    words = re.findall(r"\w+", question.lower())
+    keywords = [w for w in words if w not in QUESTION_STOPWORDS and not w.isdigit()]
+    return " ".join(keywords[:max_words])
@@ -0,0 +1,152 @@
+import json
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional, Set
+
+from langchain_core.runnables import RunnableConfig
+
+from src.utils.cancellation import SampleCancelled, remaining_time
+
+# Tools report failures as text (e.g. vqa_tool: "Error in vqa_tool: ...")
+TOOL_ERROR_PREFIXES = ("Error in ", "[Error]")
+
+
+def is_tool_error(result: Any) -> bool:
+    """Whether a tool result is an error message rather than an answer"""
+    return isinstance(result, str) and result.startswith(TOOL_ERROR_PREFIXES)
+
+
+class ToolErrorResult(Exception):
+    """A tool call that returned an error message; waiters retry instead of reusing it"""
+
+    def __init__(self, text: str):
+        super().__init__(text)
+        self.text = text
+
+
+class ToolMemo:
+    """
+    Request-scoped memo of tool results, shared by the analyst subgraphs of
+    one sample.
+
+    Calls are keyed by tool name, normalized arguments and image id. The
+    first call of a key runs the tool; concurrent and later duplicates (within
+    one agent's loop or across the parallel subgraphs) wait on its future and
+    reuse the result. A call that raises or returns an error message (see
+    `is_tool_error`) is not memoized: its caller gets the error text, and
+    callers waiting on it make their own call.
+
+    Results can also be registered ahead of time with `put` (speculative
+    prefetch); a prefetch that has not started yet or has failed falls back
+    to a regular call, and the ones nobody asked for are cancelled by
+    `cancel_unused`.
+    """
+
+    def __init__(self):
+        self.futures: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.hits = 0
+        self.prefetched: Dict[str, Future] = {}
+        self.prefetch_used: Set[str] = set()
+
+    @staticmethod
+    def make_key(tool_name: str, args: Dict[str, Any], image_id: Optional[str]) -> str:
+        # The image payload is identified by image_id instead
+        normalized = {
+            name: " ".join(value.lower().split()) if isinstance(value, str) else value
+            for name, value in args.items() if name != "image"
+        }
+        return json.dumps([tool_name, normalized, image_id], sort_keys=True, ensure_ascii=False, default=str)
+
+    def get_or_call(self, key: str, call: Callable[[], Any]) -> Any:
+        """Result of `call` for `key`, computed at most once at a time"""
+        with self.lock:
+            self.calls += 1
+            future = self.futures.get(key)
+            # A prefetch still queued behind other samples' work is no faster
+            # than calling now: take it over instead of waiting for a worker
+            if future is not None and self.prefetched.get(key) is future and future.cancel():
+                future = None
+            owner = future is None
+            if owner:
+                future = Future()
+                self.futures[key] = future
+            else:
+                self.hits += 1
+                if self.prefetched.get(key) is future:
+                    self.prefetch_used.add(key)
+
+        if not owner:
+            try:
+                result = future.result(timeout=remaining_time())
+                # Only a speculative call can have stored an error message
+                if not is_tool_error(result):
+                    return result
+                raise ToolErrorResult(result)
+            except FutureTimeoutError:
+                raise SampleCancelled("sample deadline exceeded")
+            except Exception as e:
+                prefetch = self.prefetched.get(key) is future
+                if not prefetch and not isinstance(e, ToolErrorResult):
+                    raise
+                # A speculative call, or another caller's call, failed: make our own
+                if prefetch:
+                    with self.lock:
+                        self.prefetch_used.discard(key)
+                self._discard(key, future)
+                return self.get_or_call(key, call)
+
+        try:
+            result = call()
+        except BaseException as e:
+            # Later callers retry; the ones already waiting see the error
+            with self.lock:
+                self.futures.pop(key, None)
+            future.set_exception(e)
+            raise
+        if is_tool_error(result):
+            self._discard(key, future)
+            future.set_exception(ToolErrorResult(result))
+            return result
+        future.set_result(result)
+        return result
+
+    def put(self, key: str, future: Future) -> bool:
+        """Register a speculative result for `key`; False if the key is already known"""
+        with self.lock:
+            if key in self.futures:
+                return False
+            self.futures[key] = future
+            self.prefetched[key] = future
+        future.add_done_callback(lambda f: f.cancelled() or self._discard_failed(key, f))
+        return True
+
+    def _discard_failed(self, key: str, future: Future):
+        """Drop a finished prefetch that raised or returned an error message"""
+        if future.exception() is not None or is_tool_error(future.result()):
+            self._discard(key, future)
+
+    def _discard(self, key: str, future: Future):
+        with self.lock:
+            if self.futures.get(key) is future:
+                del self.futures[key]
+
+    def cancel_unused(self) -> int:
+        """Cancel the prefetches no call has used; returns how many were still pending"""
+        with self.lock:
+            unused = [f for key, f in self.prefetched.items() if key not in self.prefetch_used]
+        # Prefetches already running finish in the background and are dropped
+        return sum(future.cancel() for future in unused)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"calls": self.calls, "hits": self.hits,
+                    "prefetched": len(self.prefetched), "prefetch_hits": len(self.prefetch_used)}
+
+
+def get_tool_memo(config: Optional[RunnableConfig]) -> Optional[ToolMemo]:
+    """The memo of the current request, carried in config["configurable"]["tool_memo"]"""
+    if not config:
+        return None
+    return config.get("configurable", {}).get("tool_memo")
@@ -0,0 +1,122 @@
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Dict, List, Optional, TextIO
+
+# Sample currently being processed by this thread / task
+_current_sample = contextvars.ContextVar("trace_sample_id", default=None)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile of an unsorted list"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+class Tracer:
+    """Records timed spans for nodes, tool calls and LLM calls"""
+
+    def __init__(self):
+        self.sink_path: Optional[str] = None
+        self.sink: Optional[TextIO] = None
+        self.durations = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def configure(self, sink_path: Optional[str] = None, append: bool = False):
+        """Reset collected durations and (optionally) open a JSONL sink, kept open until `close`"""
+        with self.lock:
+            self.durations = defaultdict(list)
+            self._close_sink()
+            self.sink_path = sink_path
+            if sink_path:
+                # Buffered: recording a span is an in-memory write, not a file open per span
+                self.sink = open(sink_path, "a" if append else "w", encoding="utf-8")
+
+    def close(self):
+        """Flush and close the sink; later spans are only kept in the summary"""
+        with self.lock:
+            self._close_sink()
+
+    def _close_sink(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+    @contextmanager
+    def sample(self, sample_id: Any):
+        """Tag every span opened in this context with `sample_id`"""
+        token = _current_sample.set(sample_id)
+        try:
+            yield
+        finally:
+            _current_sample.reset(token)
+
+    @contextmanager
+    def span(self, stage: str, **tags):
+        """Time the enclosed block and record it under `stage`"""
+        start = time.time()
+        status = "ok"
+        try:
+            yield
+        except BaseException as e:
+            status = type(e).__name__
+            raise
+        finally:
+            end = time.time()
+            self.record({
+                "stage": stage,
+                "sample_id": _current_sample.get(),
+                "start": start,
+                "end": end,
+                "duration": end - start,
+                "status": status,
+                **tags,
+            })
+
+    def record(self, span: Dict[str, Any]):
+        with self.lock:
+            self.durations[span["stage"]].append(span["duration"])
+            if self.sink is not None:
+                self.sink.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage count, mean and p50/p95/p99 latency (seconds)"""
+        with self.lock:
+            durations = {stage: list(values) for stage, values in self.durations.items()}
+        return {
+            stage: {
+                "count": len(values),
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+            }
+            for stage, values in sorted(durations.items())
+            if values
+        }
+
+
+def traced(stage: str):
+    """Decorator that records a span for a graph node, tagged with the analyst name"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(state, *args, **kwargs):
+            analyst = state.get("analyst") if isinstance(state, dict) else None
+            tags = {"agent": analyst.name} if analyst is not None else {}
+            with tracer.span(stage, **tags):
+                return func(state, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Global tracer instance
+tracer = Tracer()
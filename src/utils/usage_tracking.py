@@ -0,0 +1,163 @@
+import contextvars
+import json
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from src.utils.prompt_utils import count_tokens
+
+# Usage accumulator of the sample currently being processed
+_current_usage = contextvars.ContextVar("sample_usage", default=None)
+
+USAGE_FIELDS = ("llm_calls", "prompt_tokens", "completion_tokens", "llm_time", "cache_hits", "estimated_calls")
+
+
+def _empty() -> Dict[str, Any]:
+    return {field: 0 for field in USAGE_FIELDS}
+
+
+def _add(target: Dict[str, Any], source: Dict[str, Any]):
+    for field, value in source.items():
+        target[field] = target.get(field, 0) + value
+
+
+class SampleUsage:
+    """LLM calls, tokens and tool-loop iterations of one sample, per node and per agent"""
+
+    def __init__(self):
+        self.by_node = defaultdict(_empty)
+        self.by_agent = defaultdict(_empty)
+        self.tool_iterations = defaultdict(int)
+        self.lock = threading.Lock()
+
+    def add(self, node: str, agent: Optional[str], entry: Dict[str, Any]):
+        with self.lock:
+            _add(self.by_node[node], entry)
+            if agent:
+                _add(self.by_agent[agent], entry)
+
+    def add_tool_iteration(self, agent: str):
+        with self.lock:
+            self.tool_iterations[agent] += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            totals = _empty()
+            for entry in self.by_node.values():
+                _add(totals, entry)
+            totals["tool_iterations"] = sum(self.tool_iterations.values())
+            by_agent = {agent: dict(entry) for agent, entry in self.by_agent.items()}
+            for agent, count in self.tool_iterations.items():
+                by_agent.setdefault(agent, _empty())["tool_iterations"] = count
+            return {
+                "totals": totals,
+                "by_node": {node: dict(entry) for node, entry in self.by_node.items()},
+                "by_agent": by_agent,
+            }
+
+
+@contextmanager
+def usage_scope():
+    """Collect the usage of the enclosed work (one sample) into a SampleUsage"""
+    usage = SampleUsage()
+    reset = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(reset)
+
+
+def _text_of(value: Any) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "\n".join(_text_of(item) for item in value)
+    if isinstance(value, dict):
+        return _text_of(value.get("content", ""))
+    return _text_of(getattr(value, "content", ""))
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer count when the model tokenizer is available, else ~4 chars per token"""
+    tokens = count_tokens(text)
+    return tokens if tokens is not None else (len(text) + 3) // 4
+
+
+def record_llm_call(node: str, agent: Optional[str], prompt: Any, response: Any, latency: float):
+    """Record one LLM call of the current sample (usage from the response, estimated when missing)"""
+    usage = _current_usage.get()
+    if usage is None:
+        return
+    metadata = getattr(response, "usage_metadata", None)
+    if metadata:
+        prompt_tokens = metadata.get("input_tokens", 0)
+        completion_tokens = metadata.get("output_tokens", 0)
+        estimated = 0
+    else:
+        completion = _text_of(response)
+        tool_calls = getattr(response, "tool_calls", None)
+        if tool_calls:
+            completion += json.dumps(tool_calls, ensure_ascii=False)
+        prompt_tokens = estimate_tokens(_text_of(prompt))
+        completion_tokens = estimate_tokens(completion)
+        estimated = 1
+    usage.add(node, agent, {
+        "llm_calls": 1,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "llm_time": latency,
+        "estimated_calls": estimated,
+    })
+
+
+def record_cache_hit(node: str, agent: Optional[str]):
+    """Record an LLM call answered by the response cache (no tokens spent)"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add(node, agent, {"cache_hits": 1})
+
+
+def record_tool_iteration(agent: str):
+    """Record one pass of an agent's tool loop"""
+    usage = _current_usage.get()
+    if usage is not None:
+        usage.add_tool_iteration(agent)
+
+
+def summarize_usage(results: List[Dict]) -> Dict[str, Any]:
+    """Aggregate the per-sample `usage` of experiment results per node and per agent"""
+    totals, by_node, by_agent = {}, defaultdict(dict), defaultdict(dict)
+    samples = 0
+    for result in results:
+        usage = result.get("usage")
+        if not usage:
+            continue
+        samples += 1
+        _add(totals, usage.get("totals", {}))
+        for node, entry in usage.get("by_node", {}).items():
+            _add(by_node[node], entry)
+        for agent, entry in usage.get("by_agent", {}).items():
+            _add(by_agent[agent], entry)
+    return {
+        "samples": samples,
+        "totals": totals,
+        "by_node": dict(by_node),
+        "by_agent": dict(by_agent),
+    }
+
+
+def usage_metrics(summary: Dict[str, Any]) -> Dict[str, float]:
+    """Flat usage totals for the metrics block"""
+    samples = summary.get("samples", 0)
+    if not samples:
+        return {}
+    totals = summary["totals"]
+    return {
+        "llm_calls": totals.get("llm_calls", 0),
+        "prompt_tokens": totals.get("prompt_tokens", 0),
+        "completion_tokens": totals.get("completion_tokens", 0),
+        "prompt_tokens_per_sample": totals.get("prompt_tokens", 0) / samples,
+        "completion_tokens_per_sample": totals.get("completion_tokens", 0) / samples,
+        "tool_iterations_per_sample": totals.get("tool_iterations", 0) / samples,
+    }
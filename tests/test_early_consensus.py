@@ -0,0 +1,34 @@
+import time
+
+from src.core.nodes.analysts_node import early_consensus_analysts_node
+from src.utils.cancellation import CancelToken, cancel_scope, check_cancelled
+
+
+class FakeAnalyst:
+    """Subgraph stand-in: one in-flight call of `duration`, then a cancellation check and a second step"""
+
+    def __init__(self, name, answer, duration, log):
+        self.name, self.answer, self.duration, self.log = name, answer, duration, log
+
+    def invoke(self, state, config=None):
+        time.sleep(self.duration)
+        self.log.append((self.name, "first step done"))
+        check_cancelled()
+        self.log.append((self.name, "second step"))
+        return {"results": [{self.name: self.answer}], "rationales": [{self.name: "r"}]}
+
+
+def test_cancelled_analyst_is_drained_before_the_node_returns():
+    log = []
+    subgraphs = {
+        "Junior": FakeAnalyst("Junior", "có", 0.0, log),
+        "Senior": FakeAnalyst("Senior", "có", 0.0, log),
+        "Manager": FakeAnalyst("Manager", "không", 0.3, log),
+    }
+    with cancel_scope(CancelToken(deadline=time.time() + 10)):
+        updates = early_consensus_analysts_node({"question": "q"}, {}, subgraphs=subgraphs)
+
+    assert updates["skipped_analysts"] == ["Manager"]
+    # The Manager's in-flight step finished before the node returned, and its next step never ran
+    assert ("Manager", "first step done") in log
+    assert ("Manager", "second step") not in log
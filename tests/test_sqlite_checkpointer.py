@@ -0,0 +1,79 @@
+import operator
+import threading
+from typing import Annotated, List, TypedDict
+
+from langgraph.graph import END, START, StateGraph
+
+from src.core.sqlite_checkpointer import SqliteCheckpointSaver
+
+
+class State(TypedDict):
+    steps: Annotated[List[str], operator.add]
+
+
+def build_graph(saver):
+    graph = StateGraph(State)
+    graph.add_node("step", lambda state: {"steps": ["step"]})
+    graph.add_edge(START, "step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+class FlushDuringScan:
+    """Serializer proxy that commits another thread's checkpoint while compaction scans checkpoints"""
+
+    def __init__(self, serde, on_scan):
+        self.serde = serde
+        self.on_scan = on_scan
+        self.armed = False
+
+    def loads_typed(self, data):
+        if self.armed:
+            self.armed = False
+            self.on_scan()
+        return self.serde.loads_typed(data)
+
+    def __getattr__(self, name):
+        return getattr(self.serde, name)
+
+
+def test_compaction_keeps_blobs_of_a_checkpoint_flushed_during_the_scan(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "sessions.sqlite"), batch_size=1000, flush_interval=3600)
+    graph = build_graph(saver)
+    graph.invoke({"steps": []}, {"configurable": {"thread_id": "a"}})
+    saver.flush()
+
+    writer = {}
+
+    def concurrent_flush():
+        graph.invoke({"steps": []}, {"configurable": {"thread_id": "b"}})
+        saver.flush()
+
+    def on_scan():
+        writer["thread"] = threading.Thread(target=concurrent_flush)
+        writer["thread"].start()
+        # Give the flush the chance to commit between compaction's reads
+        writer["thread"].join(0.5)
+
+    proxy = FlushDuringScan(saver.serde, on_scan)
+    saver.serde = proxy
+    proxy.armed = True
+    saver.compact(vacuum=False)
+    writer["thread"].join()
+
+    state = graph.get_state({"configurable": {"thread_id": "b"}})
+    assert state.values == {"steps": ["step"]}
+    saver.close()
+
+
+def test_compaction_drops_unreferenced_blobs(tmp_path):
+    saver = SqliteCheckpointSaver(str(tmp_path / "sessions.sqlite"), batch_size=1,
+                                  max_checkpoints_per_thread=1)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "a"}}
+    graph.invoke({"steps": []}, config)
+    graph.invoke({"steps": []}, config)
+
+    assert saver.compact(vacuum=False)["orphan_blobs"] > 0
+    assert graph.get_state(config).values == {"steps": ["step", "step"]}
+    saver.close()
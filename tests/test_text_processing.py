@@ -0,0 +1,14 @@
+from src.utils.text_processing import extract_rationale_and_answer
+
+
+def test_answer_after_a_blank_line():
+    assert extract_rationale_and_answer("Rationale: Chiếc xe màu đỏ.\n\nAnswer: đỏ") == ("Chiếc xe màu đỏ.", "đỏ")
+
+
+def test_only_the_first_answer_line_is_kept():
+    result = "Rationale: r\nAnswer: đỏ\n### EXAMPLE 3\nAnswer: xanh"
+    assert extract_rationale_and_answer(result) == ("r", "đỏ")
+
+
+def test_missing_answer_line_gives_an_empty_answer():
+    assert extract_rationale_and_answer("Rationale: Chiếc xe màu đỏ.") == ("Chiếc xe màu đỏ.", "")
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from src.utils.tool_memo import ToolMemo, is_tool_error
+
+
+def test_duplicate_calls_share_one_result():
+    memo = ToolMemo()
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.05)
+        return "a (0.9)"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(memo.get_or_call("k", call))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["a (0.9)"] * 3
+    assert len(calls) == 1
+
+
+def test_error_result_is_not_memoized():
+    memo = ToolMemo()
+    replies = iter(["Error in vqa_tool: connection reset", "a (0.9)"])
+
+    assert memo.get_or_call("k", lambda: next(replies)) == "Error in vqa_tool: connection reset"
+    # The next analyst asking the same question makes its own call
+    assert memo.get_or_call("k", lambda: next(replies)) == "a (0.9)"
+    assert memo.get_or_call("k", lambda: "unused") == "a (0.9)"
+
+
+def test_waiters_retry_after_an_error_result():
+    memo = ToolMemo()
+    started = threading.Event()
+    calls = []
+
+    def failing():
+        calls.append("failing")
+        started.set()
+        time.sleep(0.05)
+        return "Error in vqa_tool: 503"
+
+    def succeeding():
+        calls.append("succeeding")
+        return "a (0.9)"
+
+    results = {}
+    owner = threading.Thread(target=lambda: results.update(owner=memo.get_or_call("k", failing)))
+    owner.start()
+    started.wait()
+    results["waiter"] = memo.get_or_call("k", succeeding)
+    owner.join()
+
+    assert is_tool_error(results["owner"])
+    assert results["waiter"] == "a (0.9)"
+    assert calls == ["failing", "succeeding"]
+
+
+def test_failed_prefetch_falls_back_to_a_real_call():
+    from concurrent.futures import Future
+
+    from src.utils.tool_memo import ToolErrorResult
+
+    memo = ToolMemo()
+    prefetch = Future()
+    memo.put("k", prefetch)
+    prefetch.set_running_or_notify_cancel()
+    prefetch.set_exception(ToolErrorResult("Error in vqa_tool: timeout"))
+
+    assert memo.get_or_call("k", lambda: "a (0.9)") == "a (0.9)"
+    assert memo.stats()["prefetch_hits"] == 0
+
+
+def test_prefetched_error_text_is_not_served():
+    from concurrent.futures import Future
+
+    memo = ToolMemo()
+    prefetch = Future()
+    memo.put("k", prefetch)
+    prefetch.set_running_or_notify_cancel()
+    prefetch.set_result("Error in vqa_tool: timeout")
+
+    assert memo.get_or_call("k", lambda: "a (0.9)") == "a (0.9)"
+
+
+def test_waiter_on_a_prefetch_does_not_get_its_error_text():
+    from concurrent.futures import Future
+
+    memo = ToolMemo()
+    prefetch = Future()
+    memo.put("k", prefetch)
+    prefetch.set_running_or_notify_cancel()
+    threading.Timer(0.05, prefetch.set_result, ["Error in vqa_tool: timeout"]).start()
+
+    assert memo.get_or_call("k", lambda: "a (0.9)") == "a (0.9)"